@@ -0,0 +1,98 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-gl-monthly-balance")
+@click.option("--company", help="Rebuild only this company")
+@click.option("--from-date", help="Rebuild only months from this date onwards (YYYY-MM-DD)")
+@pass_context
+def rebuild_gl_monthly_balance(context, company=None, from_date=None):
+	"Regenerate the GL Monthly Balance snapshot from GL Entry"
+	import frappe
+
+	from custom_accounting.custom_accounting.doctype.gl_monthly_balance.gl_monthly_balance import rebuild
+	from custom_accounting.custom_accounting.report import report_cache
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		rebuild(company=company, from_date=from_date)
+		# Cached Account Inquiry and Segment-Wise Trial Balance results were read from the old snapshot
+		report_cache.clear(company=company)
+	finally:
+		frappe.destroy()
+
+
+@click.command("import-chart-of-accounts")
+@click.argument("path")
+@click.option("--company", required=True, help="Company to import the accounts into")
+@click.option("--batch-size", type=int, default=500, help="Accounts inserted per commit")
+@pass_context
+def import_chart_of_accounts(context, path, company, batch_size=500):
+	"Import accounts from a CSV or JSON file and rebuild the Account tree once at the end"
+	import frappe
+
+	from custom_accounting.custom_accounting.account.chart_import import import_accounts, parse_rows
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		with open(path, encoding="utf-8") as f:
+			rows = parse_rows(f.read())
+		created = import_accounts(company, rows, batch_size=batch_size)
+		click.echo(f"Imported {len(created)} accounts into {company}")
+	finally:
+		frappe.destroy()
+
+
+@click.command("rename-locations")
+@click.option("--company", help="Rename only this company's Locations")
+@pass_context
+def rename_locations(context, company=None):
+	"Re-derive Location names, e.g. after a company abbreviation change, and update every link"
+	import frappe
+
+	from custom_accounting.custom_accounting.naming.location_bulk import rename_locations
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		frappe.set_user("Administrator")
+		renames = rename_locations(company=company)
+		frappe.db.commit()
+		click.echo(f"Renamed {len(renames)} Locations")
+	finally:
+		frappe.destroy()
+
+
+@click.command("check-report-indexes")
+@click.option("--company", help="Company whose data the sample queries use")
+@pass_context
+def check_report_indexes(context, company=None):
+	"EXPLAIN the custom reports' GL queries and show whether they use the report indexes"
+	import sys
+
+	import frappe
+
+	from custom_accounting.custom_accounting.report.report_indexes import check_report_indexes
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		results = check_report_indexes(company=company)
+	finally:
+		frappe.destroy()
+
+	for row in results:
+		status = "ok" if row.uses_report_index else "NOT USING REPORT INDEX"
+		click.echo(f"{row.query:<32} {row.table:<16} {row.key or '-':<40} rows={row.rows or 0:<10} {status}")
+
+	if not all(row.uses_report_index for row in results):
+		sys.exit(1)
+
+
+commands = [rebuild_gl_monthly_balance, import_chart_of_accounts, rename_locations, check_report_indexes]
@@ -0,0 +1,62 @@
+import frappe
+from frappe import _dict
+
+ACCOUNT_INDEX_CACHE_KEY = "custom_accounting:account_index"
+
+
+def get_account_index(company):
+	"""
+	``{account name: _dict(name, is_group, lft, rgt, account_currency, account_type)}`` for a
+	company, read once and then served from the site cache.
+	"""
+	if not company:
+		return {}
+
+	return frappe.cache.hget(ACCOUNT_INDEX_CACHE_KEY, company, generator=lambda: build_account_index(company))
+
+
+def build_account_index(company):
+	accounts = frappe.get_all(
+		"Account",
+		filters={"company": company},
+		fields=["name", "is_group", "lft", "rgt", "account_currency", "account_type"],
+		order_by="lft",
+	)
+	return {d.name: _dict(d) for d in accounts}
+
+
+def clear_account_index(doc=None, method=None, *args, **kwargs):
+	"""
+	`doc_events` handler for Account.
+
+	lft/rgt are numbered across every company's chart, so an insert in one company shifts
+	the others; the whole index is dropped rather than one company's entry.
+	"""
+	if doc is None:
+		frappe.cache.delete_value(ACCOUNT_INDEX_CACHE_KEY)
+	else:
+		delete_cache_after_commit(ACCOUNT_INDEX_CACHE_KEY)
+
+
+def delete_cache_after_commit(*keys):
+	"""
+	Delete cache ``keys`` once the current transaction commits.
+
+	An index rebuilt before the commit would be read from the old rows and then kept, so
+	document events defer the delete; each key is deleted once per transaction.
+	"""
+	pending = frappe.flags.index_cache_pending_deletes
+	if pending is None:
+		pending = frappe.flags.index_cache_pending_deletes = set()
+
+	keys = set(keys) - pending
+	if not keys:
+		return
+	pending.update(keys)
+
+	def delete():
+		pending.difference_update(keys)
+		frappe.cache.delete_value(list(keys))
+
+	frappe.db.after_commit.add(delete)
+	frappe.db.after_rollback.add(lambda: pending.difference_update(keys))
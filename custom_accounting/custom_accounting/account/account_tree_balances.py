@@ -0,0 +1,174 @@
+"""
+Balances shown in the custom chart of accounts.
+
+GL postings are aggregated per account in one grouped query and kept in the site cache per
+company, together with prefix sums in lft order, so any account's balance, group or not, is
+one nested-set range lookup. The synthetic Location and Cost Center levels of the tree are
+rolled up from the account ranges under them. The cached figures are as of today and are
+dropped when GL entries are posted.
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+import erpnext
+import frappe
+from erpnext.accounts.utils import FiscalYearError, get_fiscal_year
+from frappe.utils import flt, nowdate
+
+from custom_accounting.custom_accounting.account.account_index import get_account_index
+from custom_accounting.custom_accounting.account.account_tree_index import get_account_tree_index
+
+ACCOUNT_TREE_BALANCES_CACHE_KEY = "custom_accounting:account_tree_balances"
+
+
+def get_tree_balances(company, accounts):
+	"""
+	Balances of ``accounts``, in the shape `erpnext.accounts.utils.get_account_balances` returns.
+
+	Group accounts are rolled up over their lft/rgt range and Profit and Loss accounts only count
+	postings from the start of the fiscal year, as `get_balance_on` does.
+	"""
+	summary = get_balance_summary(company)
+	account_index = get_account_index(company)
+	lfts = summary["lfts"]
+
+	out = {}
+	for account in accounts:
+		details = account_index.get(account)
+		if not details or account in out:
+			continue
+
+		start, end = bisect_left(lfts, details.lft), bisect_right(lfts, details.rgt)
+		balance = {
+			"value": account,
+			"account_currency": details.account_currency,
+			"company_currency": summary["company_currency"],
+			"balance": flt(summary["balances"][end] - summary["balances"][start]),
+		}
+		if details.account_currency and details.account_currency != summary["company_currency"]:
+			balance["balance_in_account_currency"] = flt(
+				summary["balances_in_account_currency"][end] - summary["balances_in_account_currency"][start]
+			)
+		out[account] = balance
+
+	return out
+
+
+def get_segment_balances(company, locations=(), cost_centers=()):
+	"""
+	Company currency totals of ``locations`` and ``cost_centers`` as shown in the tree, as
+	``({location: balance}, {cost center: balance})``.
+
+	A Cost Center's total is the sum of its top-level accounts' ranges, so the ledgers under
+	them count even though only the top-level accounts carry the link; a Location's total is
+	the sum of its cost centers.
+	"""
+	index = get_account_tree_index(company)
+	company_currency = erpnext.get_company_currency(company)
+	location_cost_centers = {
+		location: index["location_cost_centers"].get(location, []) for location in locations
+	}
+
+	needed = set(cost_centers).union(*location_cost_centers.values())
+	top_level_accounts = {
+		cost_center: index["cost_center_accounts"].get(cost_center, []) for cost_center in needed
+	}
+	account_balances = get_tree_balances(company, [a for names in top_level_accounts.values() for a in names])
+	cost_center_totals = {
+		cost_center: sum(account_balances[a]["balance"] for a in names if a in account_balances)
+		for cost_center, names in top_level_accounts.items()
+	}
+
+	def balance(value, total):
+		return {"value": value, "company_currency": company_currency, "balance": flt(total)}
+
+	return (
+		{
+			location: balance(location, sum(cost_center_totals[cc] for cc in ccs))
+			for location, ccs in location_cost_centers.items()
+		},
+		{cost_center: balance(cost_center, cost_center_totals[cost_center]) for cost_center in cost_centers},
+	)
+
+
+def get_balance_summary(company):
+	date = nowdate()
+	summary = frappe.cache.hget(ACCOUNT_TREE_BALANCES_CACHE_KEY, company)
+	if not summary or summary["date"] != date:
+		summary = build_balance_summary(company, date)
+		frappe.cache.hset(ACCOUNT_TREE_BALANCES_CACHE_KEY, company, summary)
+
+	return summary
+
+
+def build_balance_summary(company, date):
+	account_index = get_account_index(company)
+	ledger = [
+		(account_index[d.account].lft, d.balance, d.balance_in_account_currency)
+		for d in get_gl_balances(company, date)
+		if d.account in account_index
+	]
+
+	ledger.sort()
+	return {
+		"date": date,
+		"company_currency": erpnext.get_company_currency(company),
+		"lfts": [d[0] for d in ledger],
+		"balances": [0, *accumulate(flt(d[1]) for d in ledger)],
+		"balances_in_account_currency": [0, *accumulate(flt(d[2]) for d in ledger)],
+	}
+
+
+def get_gl_balances(company, date):
+	try:
+		year_start_date = get_fiscal_year(date, company=company, verbose=0)[1]
+	except FiscalYearError:
+		# No fiscal year covers the date: Profit and Loss accounts show no balance, as in
+		# get_balance_on for a date before any fiscal year
+		year_start_date = None
+
+	return frappe.db.sql(
+		"""
+		select
+			gle.account,
+			sum(gle.debit) - sum(gle.credit) as balance,
+			sum(gle.debit_in_account_currency) - sum(gle.credit_in_account_currency) as balance_in_account_currency
+		from `tabGL Entry` gle
+		inner join `tabAccount` acc on acc.name = gle.account
+		where gle.company = %(company)s
+			and gle.is_cancelled = 0
+			and gle.posting_date <= %(date)s
+			and (ifnull(acc.report_type, '') != 'Profit and Loss' or gle.posting_date >= %(year_start_date)s)
+		group by gle.account
+		""",
+		{"company": company, "date": date, "year_start_date": year_start_date},
+		as_dict=True,
+	)
+
+
+def clear_tree_balances(doc=None, method=None, *args, **kwargs):
+	"""
+	`doc_events` handler for GL Entry and Account.
+
+	GL postings drop their company's figures once the transaction commits; account changes can
+	move lft/rgt in any company, so they drop them all.
+	"""
+	if doc is None or doc.doctype != "GL Entry":
+		frappe.cache.delete_value(ACCOUNT_TREE_BALANCES_CACHE_KEY)
+		return
+
+	pending = frappe.flags.tree_balance_pending_companies
+	if pending is None:
+		pending = frappe.flags.tree_balance_pending_companies = set()
+
+	if doc.company in pending:
+		return
+	pending.add(doc.company)
+
+	def clear_company():
+		pending.discard(doc.company)
+		frappe.cache.hdel(ACCOUNT_TREE_BALANCES_CACHE_KEY, doc.company)
+
+	frappe.db.after_commit.add(clear_company)
+	frappe.db.after_rollback.add(lambda: pending.discard(doc.company))
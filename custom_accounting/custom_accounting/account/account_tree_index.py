@@ -0,0 +1,130 @@
+import frappe
+
+from custom_accounting.custom_accounting.account.account_index import delete_cache_after_commit
+
+ACCOUNT_TREE_INDEX_CACHE_KEY = "custom_accounting:account_tree_index"
+# Changes whenever the index is dropped, so copies held in process memory know to rebuild
+ACCOUNT_TREE_VERSION_CACHE_KEY = "custom_accounting:account_tree_version"
+
+
+def get_account_tree_index(company):
+	"""
+	Company → Location → Cost Center → Account structure used by `custom_account_hierarchy`,
+	read once per company and then served from the site cache.
+	"""
+	return frappe.cache.hget(
+		ACCOUNT_TREE_INDEX_CACHE_KEY, company, generator=lambda: build_account_tree_index(company)
+	)
+
+
+def build_account_tree_index(company):
+	accounts = frappe.get_all(
+		"Account",
+		filters={"company": company},
+		fields=[
+			"name",
+			"account_name",
+			"account_number",
+			"parent_account",
+			"is_group",
+			"account_currency",
+			"custom_location",
+			"custom_cost_center",
+		],
+		order_by="lft",
+	)
+
+	location_names = {a.custom_location for a in accounts if a.custom_location}
+	cost_center_names = {a.custom_cost_center for a in accounts if a.custom_cost_center}
+
+	locations = {}
+	if location_names:
+		locations = {
+			d.name: d.custom_account_number
+			for d in frappe.get_all(
+				"Location",
+				filters={"name": ["in", list(location_names)]},
+				fields=["name", "custom_account_number"],
+			)
+		}
+
+	cost_centers = set()
+	if cost_center_names:
+		cost_centers = set(
+			frappe.get_all("Cost Center", filters={"name": ["in", list(cost_center_names)]}, pluck="name")
+		)
+
+	account_map = {}
+	children = {}
+	cost_center_accounts = {}
+	location_cost_centers = {}
+	titles = {}
+	titles_by_name = {}
+
+	for a in accounts:
+		account_map[a.name] = {
+			"account_name": a.account_name,
+			"account_number": a.account_number,
+			"is_group": a.is_group,
+			"account_currency": a.account_currency,
+			"parent_account": a.parent_account,
+			"location": a.custom_location,
+			"cost_center": a.custom_cost_center,
+		}
+
+		if a.parent_account:
+			children.setdefault(a.parent_account, []).append(a.name)
+
+		if a.custom_cost_center:
+			cost_center_accounts.setdefault(a.custom_cost_center, []).append(a)
+
+		if a.custom_location in locations and a.custom_cost_center in cost_centers:
+			location_cost_centers.setdefault(a.custom_location, set()).add(a.custom_cost_center)
+
+		# Accounts come in lft order, so the first account with a title wins
+		titles.setdefault((a.account_name, a.account_number or None), a.name)
+		titles_by_name.setdefault(a.account_name, a.name)
+
+	def by_account_number(names):
+		return sorted(names, key=lambda name: (account_map[name]["account_number"] or "").casefold())
+
+	# Top-level accounts of a cost center: those whose parent is not in the same cost center
+	top_level_accounts = {}
+	for cost_center, cc_accounts in cost_center_accounts.items():
+		if cost_center not in cost_centers:
+			continue
+		names_in_cc = {a.name for a in cc_accounts}
+		top_level_accounts[cost_center] = by_account_number(
+			a.name for a in cc_accounts if not a.parent_account or a.parent_account not in names_in_cc
+		)
+
+	return {
+		"locations": sorted(locations.items(), key=lambda d: d[0].casefold()),
+		"location_cost_centers": {
+			location: sorted(ccs, key=str.casefold) for location, ccs in location_cost_centers.items()
+		},
+		"accounts": account_map,
+		"children": {parent: by_account_number(names) for parent, names in children.items()},
+		"cost_center_accounts": top_level_accounts,
+		"titles": titles,
+		"titles_by_name": titles_by_name,
+	}
+
+
+def clear_account_tree_index(doc=None, method=None, *args, **kwargs):
+	"""
+	`doc_events` handler for Account, Location and Cost Center.
+
+	Locations and cost centers are shared by every company's tree, so the whole index is dropped;
+	for document events, once the transaction commits.
+	"""
+	if doc is None:
+		frappe.cache.delete_value([ACCOUNT_TREE_INDEX_CACHE_KEY, ACCOUNT_TREE_VERSION_CACHE_KEY])
+	else:
+		delete_cache_after_commit(ACCOUNT_TREE_INDEX_CACHE_KEY, ACCOUNT_TREE_VERSION_CACHE_KEY)
+
+
+def get_account_tree_version():
+	return frappe.cache.get_value(
+		ACCOUNT_TREE_VERSION_CACHE_KEY, generator=lambda: frappe.generate_hash(length=12)
+	)
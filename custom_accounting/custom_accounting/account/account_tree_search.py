@@ -0,0 +1,190 @@
+"""
+Search over the custom chart of accounts.
+
+Each account reachable in the Company → Location → Cost Center → Account tree is indexed by its
+account number, account name, location and cost center. Terms of three or more characters are
+looked up through trigram postings, shorter ones through a sorted word list, and every match
+carries the node values from the company down to the account so the tree can expand to it.
+
+The index lives in process memory per site and company and is rebuilt from the tree index
+whenever that is dropped (see `account_tree_index.get_account_tree_version`).
+"""
+
+from bisect import bisect_left
+
+import frappe
+
+from custom_accounting.custom_accounting.account.account_tree_index import (
+	get_account_tree_index,
+	get_account_tree_version,
+)
+
+SEARCH_RESULT_LIMIT = 20
+
+# {(site, company): (tree version, search index)}
+search_indexes = {}
+
+
+def search(company, txt, limit=SEARCH_RESULT_LIMIT):
+	terms = (txt or "").casefold().split()
+	if not terms:
+		return []
+
+	index = get_search_index(company)
+	matches = None
+	for term in sorted(terms, key=len, reverse=True):
+		ids = find_term(index, term)
+		matches = ids if matches is None else matches & ids
+		if not matches:
+			return []
+
+	def rank(idx):
+		entry = index["entries"][idx]
+		number = (entry["account_number"] or "").casefold()
+		name = entry["account_name"].casefold()
+		return (
+			not number.startswith(terms[0]),
+			not name.startswith(terms[0]),
+			number,
+			name,
+		)
+
+	return [index["entries"][idx] for idx in sorted(matches, key=rank)[:limit]]
+
+
+def find_term(index, term):
+	texts = index["texts"]
+
+	if len(term) < 3:
+		words = index["words"]
+		ids = set()
+		pos = bisect_left(words, (term, -1))
+		while pos < len(words) and words[pos][0].startswith(term):
+			ids.add(words[pos][1])
+			pos += 1
+		return ids
+
+	postings = sorted((index["trigrams"].get(gram, ()) for gram in get_trigrams(term)), key=len)
+	candidates = set(postings[0])
+	for posting in postings[1:]:
+		candidates.intersection_update(posting)
+		if not candidates:
+			break
+
+	# Trigrams can match out of order; confirm the term itself
+	return {idx for idx in candidates if term in texts[idx]}
+
+
+def get_trigrams(text):
+	return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def get_search_index(company):
+	version = get_account_tree_version()
+	key = (frappe.local.site, company)
+
+	cached = search_indexes.get(key)
+	if cached and cached[0] == version:
+		return cached[1]
+
+	index = build_search_index(company)
+	search_indexes[key] = (version, index)
+	return index
+
+
+def build_search_index(company):
+	tree = get_account_tree_index(company)
+	paths = get_account_paths(company, tree)
+	# Only an account directly under a cost center carries the links, so both come from the path
+	locations_by_node = {
+		f"{number} - {name}" if number else name: (name, number) for name, number in tree["locations"]
+	}
+
+	entries = []
+	texts = []
+	trigrams = {}
+	words = []
+
+	for name, path in paths.items():
+		account = tree["accounts"][name]
+		location, location_number = locations_by_node[path[1]]
+		cost_center = path[2]
+		fields = [
+			account["account_number"],
+			account["account_name"],
+			location,
+			location_number,
+			cost_center,
+		]
+		text = " ".join(field for field in fields if field).casefold()
+
+		idx = len(entries)
+		entries.append(
+			{
+				"account": name,
+				"account_number": account["account_number"],
+				"account_name": account["account_name"],
+				"location": location,
+				"cost_center": cost_center,
+				"path": path,
+			}
+		)
+		texts.append(text)
+
+		for gram in get_trigrams(text):
+			trigrams.setdefault(gram, []).append(idx)
+		words.extend((word, idx) for word in set(text.split()))
+
+	words.sort()
+	return {"entries": entries, "texts": texts, "trigrams": trigrams, "words": words}
+
+
+def get_account_paths(company, tree):
+	"""
+	``{account: [node values from the company down to the account]}`` for every account the
+	tree shows, following the same values `custom_account_hierarchy.get_children` returns.
+	Accounts outside any location's cost centers are left out.
+	"""
+	company_abbr = frappe.get_cached_value("Company", company, "abbr") or ""
+	accounts = tree["accounts"]
+
+	location_of_cost_center = {}
+	for name, number in tree["locations"]:
+		for cost_center in tree["location_cost_centers"].get(name, []):
+			location_of_cost_center.setdefault(cost_center, f"{number} - {name}" if number else name)
+
+	cost_center_of_top_level = {}
+	for cost_center, names in tree["cost_center_accounts"].items():
+		if cost_center in location_of_cost_center:
+			for name in names:
+				cost_center_of_top_level.setdefault(name, cost_center)
+
+	def account_nodes(name):
+		account = accounts[name]
+		main_title = (
+			f"{account['account_number']} - {account['account_name']}"
+			if account["account_number"]
+			else account["account_name"] or ""
+		)
+		# With a company abbreviation, each account shows as its title first and then its real node
+		return [main_title, name] if company_abbr else [name]
+
+	paths = {}
+	for name in accounts:
+		chain = []
+		current = name
+		while current and current in accounts and current not in cost_center_of_top_level:
+			chain.append(current)
+			current = accounts[current]["parent_account"]
+
+		if current not in cost_center_of_top_level:
+			continue
+
+		chain.append(current)
+		cost_center = cost_center_of_top_level[current]
+		path = [company, location_of_cost_center[cost_center], cost_center]
+		for account in reversed(chain):
+			path.extend(account_nodes(account))
+		paths[name] = path
+
+	return paths
@@ -0,0 +1,256 @@
+"""
+Bulk import of accounts into the custom chart of accounts.
+
+Rows name their parent by Account name, account number or "acc_no - acc_name" title, and may
+link a Location and a Cost Center. Parents are resolved from an in-memory map of the existing
+chart and the rows imported so far, and accounts are inserted in batches with nested set
+updates switched off; lft/rgt are rebuilt once at the end instead of on every insert.
+
+Everything `Account.validate` would reject part way through a batch (a missing or ambiguous
+parent, a parent that is not a group, a repeated account number or account name) is checked
+for the whole file before the first account is inserted.
+"""
+
+import copy
+import json
+
+import frappe
+from erpnext.accounts.doctype.account.account import get_account_autoname
+from frappe import _
+from frappe.utils import cint
+from frappe.utils.csvutils import read_csv_content
+from frappe.utils.nestedset import rebuild_tree
+
+from custom_accounting.custom_accounting.account.account_index import clear_account_index
+from custom_accounting.custom_accounting.account.account_tree_balances import clear_tree_balances
+from custom_accounting.custom_accounting.account.account_tree_index import (
+	build_account_tree_index,
+	clear_account_tree_index,
+)
+
+IMPORT_BATCH_SIZE = 500
+ACCOUNT_FIELDS = (
+	"account_name",
+	"account_number",
+	"is_group",
+	"root_type",
+	"account_type",
+	"account_currency",
+)
+
+
+@frappe.whitelist()
+def import_chart_of_accounts(company, data):
+	"""
+	Queue an import of ``data`` (a JSON list of rows, or CSV text with a header row) into
+	``company``'s chart. Rows are checked before the job is queued.
+	"""
+	frappe.has_permission("Account", "create", throw=True)
+
+	rows = parse_rows(data)
+	prepare_rows(company, copy.deepcopy(rows))
+
+	job = frappe.enqueue(
+		"custom_accounting.custom_accounting.account.chart_import.import_accounts",
+		queue="long",
+		timeout=3600,
+		company=company,
+		rows=rows,
+	)
+	return {"job_id": job.id if job else None, "rows": len(rows)}
+
+
+def parse_rows(data):
+	"""Rows as dicts from a JSON list or from CSV text whose first row holds the field names."""
+	if isinstance(data, list):
+		return [frappe._dict(row) for row in data]
+
+	data = data.strip()
+	if data.startswith("["):
+		return [frappe._dict(row) for row in json.loads(data)]
+
+	header, *rows = read_csv_content(data)
+	header = [frappe.scrub(column) for column in header]
+	return [frappe._dict(zip(header, row, strict=False)) for row in rows if any(row)]
+
+
+def import_accounts(company, rows, batch_size=IMPORT_BATCH_SIZE):
+	"""
+	Insert ``rows`` into ``company``'s chart, parents first, committing every ``batch_size``
+	accounts. Returns the names of the accounts created.
+	"""
+	rows = prepare_rows(company, [frappe._dict(row) for row in rows])
+	created = []
+
+	frappe.local.flags.ignore_update_nsm = True
+	try:
+		for idx, row in enumerate(rows, 1):
+			parent_account = row.parent_account
+			if row.parent_row is not None:
+				parent_account = rows[row.parent_row].account
+
+			account = frappe.get_doc(
+				{
+					"doctype": "Account",
+					"company": company,
+					"parent_account": parent_account,
+					"custom_location": row.location,
+					"custom_cost_center": row.cost_center,
+					**{field: row.get(field) for field in ACCOUNT_FIELDS if row.get(field) not in (None, "")},
+				}
+			)
+			account.insert()
+			row.account = account.name
+			created.append(account.name)
+
+			if idx % batch_size == 0:
+				frappe.db.commit()
+	except Exception:
+		# Earlier batches stay and still get their lft/rgt below
+		frappe.db.rollback()
+		raise
+	finally:
+		frappe.local.flags.ignore_update_nsm = False
+		rebuild_tree("Account")
+		frappe.db.commit()
+
+		# lft/rgt moved without document events
+		clear_account_index()
+		clear_account_tree_index()
+		clear_tree_balances()
+
+	return created
+
+
+def prepare_rows(company, rows):
+	"""
+	Check every row and order them so that parents come before their children.
+
+	A row's parent is either an existing account, kept in ``parent_account``, or another row,
+	whose position is kept in ``parent_row``.
+	"""
+	index = build_account_tree_index(company)
+	accounts = index["accounts"]
+
+	# Every way an account can be referred to, with all the accounts it could mean
+	existing = {}
+	for name, account in accounts.items():
+		for key in get_account_keys(name, account["account_number"], account["account_name"]):
+			existing.setdefault(key, set()).add(name)
+
+	account_numbers = {
+		account["account_number"] for account in accounts.values() if account["account_number"]
+	}
+	account_names = set(accounts)
+
+	new = {}
+	for idx, row in enumerate(rows):
+		if not row.get("account_name"):
+			frappe.throw(_("Row {0}: Account Name is required").format(idx + 1))
+
+		row.is_group = cint(row.get("is_group"))
+		row.account_number = (row.get("account_number") or "").strip() or None
+		if row.account_number:
+			if row.account_number in account_numbers:
+				frappe.throw(
+					_("Row {0}: Account Number {1} is already used").format(
+						idx + 1, frappe.bold(row.account_number)
+					)
+				)
+			account_numbers.add(row.account_number)
+
+		name = get_account_autoname(row.account_number, row.account_name, company)
+		if name in account_names:
+			frappe.throw(_("Row {0}: Account {1} already exists").format(idx + 1, frappe.bold(name)))
+		account_names.add(name)
+
+		for key in get_account_keys(None, row.account_number, row.account_name):
+			new.setdefault(key, set()).add(idx)
+
+	locations = set(frappe.get_all("Location", pluck="name"))
+	cost_centers = set(frappe.get_all("Cost Center", filters={"company": company}, pluck="name"))
+
+	for idx, row in enumerate(rows):
+		row.parent_row = None
+		row.parent_account = None
+		parent = (row.get("parent_account") or "").strip()
+		if parent:
+			existing_matches = existing.get(parent, set())
+			new_matches = new.get(parent, set()) - {idx}
+			if not existing_matches and not new_matches:
+				frappe.throw(_("Row {0}: Parent Account {1} not found").format(idx + 1, frappe.bold(parent)))
+			if len(existing_matches) + len(new_matches) > 1:
+				frappe.throw(
+					_("Row {0}: Parent Account {1} is ambiguous, use its number or full name").format(
+						idx + 1, frappe.bold(parent)
+					)
+				)
+
+			if existing_matches:
+				row.parent_account = next(iter(existing_matches))
+				parent_is_group = accounts[row.parent_account]["is_group"]
+			else:
+				row.parent_row = next(iter(new_matches))
+				parent_is_group = rows[row.parent_row].is_group
+
+			if not parent_is_group:
+				frappe.throw(
+					_("Row {0}: Parent Account {1} is not a group").format(idx + 1, frappe.bold(parent))
+				)
+
+		if not row.parent_account and row.parent_row is None and not (row.is_group and row.root_type):
+			frappe.throw(
+				_("Row {0}: Accounts without a parent must be groups with a Root Type").format(idx + 1)
+			)
+
+		row.location = row.get("location") or None
+		if row.location and row.location not in locations:
+			frappe.throw(_("Row {0}: Location {1} not found").format(idx + 1, frappe.bold(row.location)))
+
+		row.cost_center = row.get("cost_center") or None
+		if row.cost_center and row.cost_center not in cost_centers:
+			frappe.throw(
+				_("Row {0}: Cost Center {1} not found").format(idx + 1, frappe.bold(row.cost_center))
+			)
+
+	return order_parents_first(rows)
+
+
+def get_account_keys(name, account_number, account_name):
+	"""The ways a row can name its parent: Account name, number, "acc_no - acc_name" or account_name."""
+	keys = {account_name}
+	if name:
+		keys.add(name)
+	if account_number:
+		keys.update((account_number, f"{account_number} - {account_name}"))
+	return keys
+
+
+def order_parents_first(rows):
+	"""Rows sorted so that every ``parent_row`` comes earlier, with ``parent_row`` renumbered."""
+	ordered = []
+	position = {}
+	visiting = set()
+
+	def visit(idx):
+		if idx in position:
+			return
+		if idx in visiting:
+			frappe.throw(_("Row {0}: Parents form a loop").format(idx + 1))
+
+		visiting.add(idx)
+		if rows[idx].parent_row is not None:
+			visit(rows[idx].parent_row)
+		visiting.discard(idx)
+
+		position[idx] = len(ordered)
+		ordered.append(rows[idx])
+
+	for idx in range(len(rows)):
+		visit(idx)
+
+	for row in ordered:
+		if row.parent_row is not None:
+			row.parent_row = position[row.parent_row]
+
+	return ordered
@@ -0,0 +1,58 @@
+import frappe
+
+from custom_accounting.custom_accounting.account.account_index import delete_cache_after_commit
+
+COST_CENTER_INDEX_CACHE_KEY = "custom_accounting:cost_center_index"
+
+
+def get_cost_center_index(company):
+	"""
+	Location → top-level cost centers and parent → child cost centers for a company, as tree
+	nodes, read once and then served from the site cache.
+	"""
+	return frappe.cache.hget(
+		COST_CENTER_INDEX_CACHE_KEY, company, generator=lambda: build_cost_center_index(company)
+	)
+
+
+def build_cost_center_index(company):
+	cost_centers = frappe.get_all(
+		"Cost Center",
+		fields=["name", "is_group", "parent_cost_center", "custom_location"],
+		filters={"company": company},
+	)
+	location_by_name = {cc.name: cc.custom_location for cc in cost_centers}
+
+	location_nodes = {}
+	children = {}
+	for cc in cost_centers:
+		node = {"value": cc.name, "expandable": 1 if cc.is_group else 0}
+
+		if cc.parent_cost_center:
+			children.setdefault(cc.parent_cost_center, []).append(node)
+
+		if not cc.custom_location:
+			continue
+
+		# Top-level within a location: no parent, or a parent in another location
+		location_nodes.setdefault(cc.custom_location, [])
+		if not cc.parent_cost_center or location_by_name.get(cc.parent_cost_center) != cc.custom_location:
+			location_nodes[cc.custom_location].append(node)
+
+	return {
+		"locations": sorted(location_nodes),
+		"location_nodes": location_nodes,
+		"children": children,
+		"cost_centers": set(location_by_name),
+	}
+
+
+def clear_cost_center_index(doc=None, method=None, *args, **kwargs):
+	"""
+	`doc_events` handler for Cost Center; moving a cost center can change another company's tree.
+	Document events drop the index once the transaction commits.
+	"""
+	if doc is None:
+		frappe.cache.delete_value(COST_CENTER_INDEX_CACHE_KEY)
+	else:
+		delete_cache_after_commit(COST_CENTER_INDEX_CACHE_KEY)
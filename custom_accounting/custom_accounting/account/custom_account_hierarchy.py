@@ -1,11 +1,18 @@
 import frappe
 import erpnext.accounts.utils
 import json
+from frappe.utils import cint
+
+from custom_accounting.custom_accounting.account import account_tree_search
+from custom_accounting.custom_accounting.account.account_tree_balances import get_segment_balances, get_tree_balances
+from custom_accounting.custom_accounting.account.account_tree_index import get_account_tree_index
 
 @frappe.whitelist()
 def get_children(doctype, parent=None, company=None, is_root=False):
     """
     Company → Location → Cost Center → Accounts
+
+    Every level is answered from the cached per-company tree index.
     """
     if not company:
         frappe.throw("Company is required")
@@ -23,162 +30,227 @@ def get_children(doctype, parent=None, company=None, is_root=False):
     if not parent:
         return [{"value": company, "expandable": True, "title": company}]
 
+    index = get_account_tree_index(company)
+    accounts = index["accounts"]
+
     # LEVEL 2: Locations under Company
     if parent == company:
-        loc_accounts = frappe.get_all(
-            "Account",
-            filters={"company": company},
-            fields=["distinct custom_location as value"],
-            order_by="custom_location"
-        )
-        loc_values = [la.value for la in loc_accounts if la.value]
-        if loc_values:
-            locs = frappe.get_all(
-                "Location",
-                filters={"name": ["in", loc_values]},
-                fields=["name", "custom_account_number"],
-                order_by="name"
-            )
-            loc_map = {loc.name: loc.custom_account_number for loc in locs}
-            return [
-                {
-                    "value": f"{loc_map.get(loc.name, '')} - {loc.name}" if loc_map.get(loc.name) else loc.name,
-                    "title": f"{loc_map.get(loc.name, '')} - {loc.name}" if loc_map.get(loc.name) else loc.name,
-                    "expandable": True,
-                    "is_ledger": False,
-                    "hide_add": True
-                }
-                for loc in locs
-            ]
-        return []
+        return [
+            {
+                "value": f"{number} - {name}" if number else name,
+                "title": f"{number} - {name}" if number else name,
+                "expandable": True,
+                "is_ledger": False,
+                "hide_add": True
+            }
+            for name, number in index["locations"]
+        ]
 
     # LEVEL 3: Cost Centers under a Location (⚙ modified part)
-    actual_loc = parent
-    if " - " in parent:
-        parts = parent.split(" - ", 1)
-        first_part = parts[0].strip()
-        if first_part and first_part.replace("-", "").isdigit():
-            actual_loc = parts[1].strip()
-
-    if frappe.db.exists("Location", actual_loc):
-        cost_centers = frappe.get_all(
-            "Account",
-            filters={"company": company, "custom_location": actual_loc},
-            fields=["distinct custom_cost_center as value"],
-            order_by="custom_cost_center"
-        )
-        if cost_centers:
-            cc_values = [cc.value for cc in cost_centers if cc.value]
-            if cc_values:
-                # Fetch only name (ignore custom_account_number for Cost Centers)
-                ccs = frappe.get_all(
-                    "Cost Center",
-                    filters={"name": ["in", cc_values]},
-                    fields=["name"],
-                    order_by="name"
-                )
-                return [
-                    {
-                        "value": cc.name,
-                        "title": cc.name,
-                        "expandable": True,
-                        "is_ledger": False
-                    }
-                    for cc in ccs
-                ]
+    actual_loc = strip_title_number(parent)
+
+    if actual_loc in index["location_cost_centers"]:
+        return [
+            {
+                "value": cc,
+                "title": cc,
+                "expandable": True,
+                "is_ledger": False
+            }
+            for cc in index["location_cost_centers"][actual_loc]
+        ]
 
     # CASE A: parent is a synthetic base node (main_title)
     if company_suffix and not parent.endswith(company_suffix):
-        if " - " in parent:
-            parts = parent.split(" - ", 1)
-            acc_no = parts[0]
-            acc_name = parts[1]
-        else:
-            acc_no = None
-            acc_name = parent
-
-        filters = {"company": company, "account_name": acc_name}
-        if acc_no:
-            filters["account_number"] = acc_no
-
-        real_accs = frappe.get_all("Account", filters=filters, fields=["name"], limit=1)
-        if not real_accs:
+        real_name = resolve_account_title(index, parent)
+        if not real_name:
             return []
 
-        real_name = real_accs[0].name
-        acc = frappe.get_doc("Account", real_name)
-        main_title = format_main_title(acc.account_number, acc.account_name)
+        acc = accounts[real_name]
+        main_title = format_main_title(acc["account_number"], acc["account_name"])
         real_title = f"{main_title}{company_suffix}"
 
         return [{
-            "value": acc.name,
+            "value": real_name,
+            "account": real_name,
             "title": real_title,
-            "expandable": 1 if acc.is_group else 0,
+            "expandable": 1 if acc["is_group"] else 0,
             "is_ledger": True,
-            "account_currency": acc.account_currency
+            "account_currency": acc["account_currency"]
         }]
 
     # CASE B: Parent is an actual account → return child accounts
-    children = frappe.get_all(
-        "Account",
-        filters={"company": company, "parent_account": parent},
-        fields=["name", "account_name", "account_number", "is_group", "account_currency"],
-        order_by="account_number asc"
-    )
+    children = index["children"].get(parent)
     if children:
         nodes = []
-        for ch in children:
-            main_title = format_main_title(ch.get("account_number"), ch.get("account_name"))
-            node = {"title": main_title, "is_ledger": True}
+        for name in children:
+            ch = accounts[name]
+            main_title = format_main_title(ch["account_number"], ch["account_name"])
+            node = {"title": main_title, "is_ledger": True, "account": name}
             if company_suffix:
                 node["value"] = main_title
                 node["expandable"] = 1
             else:
-                node["value"] = ch['name']
-                node["expandable"] = ch.get("is_group", 0)
-                node["account_currency"] = ch.get("account_currency")
+                node["value"] = name
+                node["expandable"] = ch["is_group"]
+                node["account_currency"] = ch["account_currency"]
             nodes.append(node)
         return nodes
 
     # CASE C: parent is likely a Cost Center → return top-level accounts
-    actual_cc = parent
-    if " - " in parent:
-        parts = parent.split(" - ", 1)
+    actual_cc = strip_title_number(parent)
+
+    result_nodes = []
+    for name in index["cost_center_accounts"].get(actual_cc, []):
+        acc = accounts[name]
+        main_title = format_main_title(acc["account_number"], acc["account_name"])
+        node = {"title": main_title, "is_ledger": True, "account": name}
+        if company_suffix:
+            node["value"] = main_title
+            node["expandable"] = 1
+        else:
+            full_title = f"{main_title}{company_suffix}"
+            node["value"] = name
+            node["title"] = full_title
+            node["expandable"] = acc["is_group"]
+            node["account_currency"] = acc["account_currency"]
+        result_nodes.append(node)
+
+    return result_nodes
+
+
+def strip_title_number(value):
+    """Strip a numeric prefix from a tree title: "1001 - Dubai" → "Dubai"."""
+    if " - " in value:
+        parts = value.split(" - ", 1)
         first_part = parts[0].strip()
         if first_part and first_part.replace("-", "").isdigit():
-            actual_cc = parts[1].strip()
-
-    if frappe.db.exists("Cost Center", actual_cc):
-        accounts_in_cc = frappe.get_all(
-            "Account",
-            filters={"company": company, "custom_cost_center": actual_cc},
-            fields=["name", "account_name", "account_number", "parent_account", "is_group", "account_currency"],
-            order_by="account_number asc"
-        )
-        if not accounts_in_cc:
-            return []
+            return parts[1].strip()
+    return value
 
-        names_in_cc = {a["name"] for a in accounts_in_cc}
-        top_level = [a for a in accounts_in_cc if not a.get("parent_account") or a.get("parent_account") not in names_in_cc]
 
-        result_nodes = []
-        for acc in top_level:
-            main_title = format_main_title(acc.get("account_number"), acc.get("account_name"))
-            node = {"title": main_title, "is_ledger": True}
-            if company_suffix:
-                node["value"] = main_title
-                node["expandable"] = 1
-            else:
-                full_title = f"{main_title}{company_suffix}"
-                node["value"] = acc['name']
-                node["title"] = full_title
-                node["expandable"] = acc.get("is_group", 0)
-                node["account_currency"] = acc.get("account_currency")
-            result_nodes.append(node)
+def resolve_account_title(index, title):
+    """Account name for an "acc_no - acc_name" (or bare acc_name) tree title, or None."""
+    if " - " in title:
+        acc_no, acc_name = title.split(" - ", 1)
+        return index["titles"].get((acc_name, acc_no))
+    return index["titles_by_name"].get(title)
+
+
+@frappe.whitelist()
+def get_subtree(doctype, parent, company=None, label=None, depth=None, is_root=False):
+    """
+    Children of `parent` and of every expandable node below it, down to `depth` levels
+    (all of them when not set), in the [{"parent": ..., "data": [...]}] shape that
+    `frappe.desk.treeview.get_all_nodes` returns. Account nodes carry their balances
+    when the chart shows them.
+    """
+    depth = cint(depth)
 
-        return result_nodes
+    out = [{"parent": label or parent, "data": get_children(doctype, parent=parent, company=company, is_root=is_root)}]
+    expanded = {parent}
+    to_expand = [d["value"] for d in out[0]["data"] if d.get("expandable")]
+    level = 1
 
-    return []
+    while to_expand and (not depth or level < depth):
+        next_level = []
+        for value in to_expand:
+            if value in expanded:
+                continue
+            expanded.add(value)
+
+            data = get_children(doctype, parent=value, company=company)
+            out.append({"parent": value, "data": data})
+            next_level.extend(d["value"] for d in data if d.get("expandable"))
+
+        to_expand = next_level
+        level += 1
+
+    if company and show_balances():
+        set_subtree_balances(out, company)
+
+    return out
+
+
+def show_balances():
+    return frappe.has_permission("GL Entry") and frappe.db.get_single_value(
+        "Accounts Settings", "show_balance_in_coa"
+    )
+
+
+def set_subtree_balances(subtree, company):
+    nodes = [node for d in subtree for node in d["data"]]
+    balances = get_balances_for_nodes(company, [node["value"] for node in nodes])
+
+    for node in nodes:
+        if node["value"] in balances:
+            node["balance"] = balances[node["value"]]
+
+
+@frappe.whitelist()
+def get_node_balances(company, nodes):
+    """
+    Balances of the visible tree nodes in one call: accounts (real or "acc_no - acc_name"),
+    and the synthetic Location and Cost Center levels, as {node value: balance}.
+    """
+    if isinstance(nodes, str):
+        nodes = json.loads(nodes)
+
+    if not show_balances():
+        return {}
+
+    return get_balances_for_nodes(company, nodes)
+
+
+def get_balances_for_nodes(company, values):
+    index = get_account_tree_index(company)
+    location_names = {name for name, number in index["locations"]}
+
+    # Classified the way get_children resolves a parent
+    locations, cost_centers, accounts = {}, {}, {}
+    for value in values:
+        if value == company:
+            continue
+
+        location = strip_title_number(value)
+        if location in location_names:
+            locations[value] = location
+        elif value in index["cost_center_accounts"]:
+            cost_centers[value] = value
+        elif value in index["accounts"]:
+            accounts[value] = value
+        else:
+            account = resolve_account_title(index, value)
+            if account:
+                accounts[value] = account
+
+    location_balances, cost_center_balances = get_segment_balances(
+        company, locations.values(), cost_centers.values()
+    )
+    account_balances = get_tree_balances(company, accounts.values())
+
+    balances = {}
+    for nodes, node_balances in (
+        (locations, location_balances),
+        (cost_centers, cost_center_balances),
+        (accounts, account_balances),
+    ):
+        for value, name in nodes.items():
+            if name in node_balances:
+                balances[value] = node_balances[name]
+
+    return balances
+
+
+@frappe.whitelist()
+def search_accounts(company, txt, limit=None):
+    """
+    Accounts matching `txt` on account number, account name, location or cost center, each
+    with the `path` of node values to expand from the company down to it.
+    """
+    frappe.has_permission("Account", throw=True)
+
+    return account_tree_search.search(company, txt, limit=cint(limit) or account_tree_search.SEARCH_RESULT_LIMIT)
 
 
 @frappe.whitelist()
@@ -189,61 +261,35 @@ def add_custom_ac(**args):
     if not company:
         frappe.throw("Company is required")
 
-    is_cost_center_parent = False
-    is_location_parent = False
+    # Location and Cost Center nodes have no Account behind them: the new account is created
+    # without a parent and linked to the node instead
+    link_field = None
+    link_value = None
 
     if parent_account:
-        if frappe.db.exists("Account", parent_account):
-            pass
-        else:
-            actual_parent = parent_account
-            if " - " in parent_account:
-                parts = parent_account.split(" - ", 1)
-                first_part = parts[0].strip()
-                if first_part and first_part.replace("-", "").isdigit():
-                    actual_parent = parts[1].strip()
-
-            if frappe.get_all("Account", filters={"company": company, "custom_cost_center": actual_parent}, limit=1):
-                args['parent_account'] = None
-                is_cost_center_parent = True
-            elif frappe.get_all("Account", filters={"company": company, "custom_location": actual_parent}, limit=1):
-                args['parent_account'] = None
-                is_location_parent = True
-
-            if not is_cost_center_parent and not is_location_parent:
-                if frappe.get_all("Account", filters={"company": company, "custom_cost_center": parent_account}, limit=1):
-                    args['parent_account'] = None
-                    is_cost_center_parent = True
-                elif frappe.get_all("Account", filters={"company": company, "custom_location": parent_account}, limit=1):
+        index = get_account_tree_index(company)
+        location_names = {name for name, number in index["locations"]}
+
+        if parent_account not in index["accounts"]:
+            for value in (strip_title_number(parent_account), parent_account):
+                if value in index["cost_center_accounts"]:
+                    link_field, link_value = "custom_cost_center", value
+                elif value in location_names:
+                    link_field, link_value = "custom_location", value
+
+                if link_field:
                     args['parent_account'] = None
-                    is_location_parent = True
+                    break
+            else:
+                real_name = resolve_account_title(index, parent_account)
+                if real_name:
+                    args['parent_account'] = real_name
                 else:
-                    company_abbr = frappe.get_cached_value("Company", company, "abbr") or ""
-                    company_suffix = f" - {company_abbr}" if company_abbr else ""
-
-                    if " - " in parent_account:
-                        parts = parent_account.split(" - ", 1)
-                        acc_no = parts[0]
-                        acc_name = parts[1]
-                    else:
-                        acc_no = None
-                        acc_name = parent_account
-
-                    filters = {"company": company, "account_name": acc_name}
-                    if acc_no:
-                        filters["account_number"] = acc_no
-
-                    real_accs = frappe.get_all("Account", filters=filters, fields=["name"], limit=1)
-                    if real_accs:
-                        args['parent_account'] = real_accs[0].name
-                    else:
-                        frappe.throw(f"No account found for '{parent_account}' in company '{company}'")
+                    frappe.throw(f"No account found for '{parent_account}' in company '{company}'")
 
     new_account = erpnext.accounts.utils.add_ac(**args)
 
-    if is_cost_center_parent:
-        frappe.db.set_value("Account", new_account, "custom_cost_center", actual_parent if 'actual_parent' in locals() else parent_account)
-    if is_location_parent:
-        frappe.db.set_value("Account", new_account, "custom_location", actual_parent if 'actual_parent' in locals() else parent_account)
+    if link_field:
+        frappe.db.set_value("Account", new_account, link_field, link_value)
 
     return new_account
@@ -0,0 +1,256 @@
+# Copyright (c) 2026, example.com and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_to_date, flt, get_datetime, get_first_day, getdate, now, now_datetime
+
+from custom_accounting.custom_accounting.report import report_cache
+
+SNAPSHOT_READY_KEY = "gl_monthly_balance_ready:{0}"
+SNAPSHOT_STALE_KEY = "gl_monthly_balance_stale:{0}"
+
+# Reposts run in background jobs after they are submitted; a stale snapshot is only rebuilt once
+# the last repost for the company was submitted this long ago, so a half-reposted ledger is not read
+REPOST_SETTLE_MINUTES = 30
+REKEY_CHUNK_SIZE = 1000
+
+
+class GLMonthlyBalance(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("GL Monthly Balance", ["company", "period_start"])
+	frappe.db.add_index("GL Monthly Balance", ["company", "account", "period_start"])
+
+
+def get_snapshot_name(company, account, cost_center, location, finance_book, is_opening, period_start):
+	"""Deterministic row name for a snapshot key; kept in step with the MD5 used by `rebuild`."""
+	key = "|".join(
+		[
+			company,
+			account or "",
+			cost_center or "",
+			location or "",
+			finance_book or "",
+			is_opening or "No",
+			getdate(period_start).strftime("%Y-%m"),
+		]
+	)
+	return hashlib.md5(key.encode()).hexdigest()
+
+
+def rekey_snapshot_rows(locations):
+	"""
+	Recompute the names of ``locations``' snapshot rows after their location column was changed
+	in SQL, e.g. by a Location rename, so that later postings update them instead of adding rows.
+	"""
+	locations = list(locations)
+	for start in range(0, len(locations), REKEY_CHUNK_SIZE):
+		frappe.db.sql(
+			"""
+			UPDATE `tabGL Monthly Balance`
+			SET name = MD5(CONCAT_WS('|', company, IFNULL(account, ''), IFNULL(cost_center, ''),
+				IFNULL(location, ''), IFNULL(finance_book, ''), IFNULL(NULLIF(is_opening, ''), 'No'),
+				DATE_FORMAT(period_start, '%%Y-%%m')))
+			WHERE location IN %(locations)s
+			""",
+			{"locations": tuple(locations[start : start + REKEY_CHUNK_SIZE])},
+		)
+
+
+def update_from_gl_entry(doc, method=None):
+	"""`doc_events` handler for GL Entry: add the posted amounts to the month's snapshot row."""
+	apply_gl_entry(doc, 1)
+
+
+def reverse_gl_entry(doc, method=None):
+	"""`doc_events` handler for GL Entry deletion: take the amounts back out of the snapshot."""
+	apply_gl_entry(doc, -1)
+
+
+def apply_gl_entry(gle, sign):
+	period_start = get_first_day(gle.posting_date)
+	is_opening = gle.get("is_opening") or "No"
+	timestamp = now()
+
+	frappe.db.sql(
+		"""
+		INSERT INTO `tabGL Monthly Balance`
+			(name, creation, modified, modified_by, owner, docstatus,
+			company, account, cost_center, location, finance_book, is_opening, account_currency,
+			period_start, debit, credit, debit_in_account_currency, credit_in_account_currency)
+		VALUES
+			(%(name)s, %(timestamp)s, %(timestamp)s, %(user)s, %(user)s, 0,
+			%(company)s, %(account)s, %(cost_center)s, %(location)s, %(finance_book)s, %(is_opening)s,
+			%(account_currency)s, %(period_start)s, %(debit)s, %(credit)s,
+			%(debit_in_account_currency)s, %(credit_in_account_currency)s)
+		ON DUPLICATE KEY UPDATE
+			debit = debit + VALUES(debit),
+			credit = credit + VALUES(credit),
+			debit_in_account_currency = debit_in_account_currency + VALUES(debit_in_account_currency),
+			credit_in_account_currency = credit_in_account_currency + VALUES(credit_in_account_currency),
+			modified = VALUES(modified)
+		""",
+		{
+			"name": get_snapshot_name(
+				gle.company,
+				gle.account,
+				gle.cost_center,
+				gle.get("location"),
+				gle.finance_book,
+				is_opening,
+				period_start,
+			),
+			"timestamp": timestamp,
+			"user": frappe.session.user,
+			"company": gle.company,
+			"account": gle.account,
+			"cost_center": gle.cost_center or None,
+			"location": gle.get("location") or None,
+			"finance_book": gle.finance_book or None,
+			"is_opening": is_opening,
+			"account_currency": gle.account_currency,
+			"period_start": period_start,
+			"debit": sign * flt(gle.debit),
+			"credit": sign * flt(gle.credit),
+			"debit_in_account_currency": sign * flt(gle.debit_in_account_currency),
+			"credit_in_account_currency": sign * flt(gle.credit_in_account_currency),
+		},
+	)
+
+
+def is_snapshot_ready(company):
+	"""True once `rebuild` has populated the snapshot for ``company`` and nothing has made it stale."""
+	return bool(frappe.db.get_global(SNAPSHOT_READY_KEY.format(company)))
+
+
+def mark_snapshot_stale_for_repost(doc, method=None):
+	"""
+	`doc_events` handler for Repost Item Valuation and Repost Accounting Ledger submission.
+
+	Reposts delete GL rows with plain SQL, which never runs the GL Entry hooks above.
+	"""
+	dates = [doc.get("posting_date")]
+	dates += [
+		frappe.db.get_value(row.voucher_type, row.voucher_no, "posting_date")
+		for row in doc.get("vouchers") or []
+	]
+	if all(dates):
+		mark_snapshot_stale(doc.company, min(getdate(d) for d in dates))
+	else:
+		mark_snapshot_stale(doc.company)
+
+
+def mark_snapshot_stale(company, from_date=None):
+	"""
+	Stop the reports from reading ``company``'s snapshot until `rebuild_stale_snapshots` has
+	rebuilt it from ``from_date`` (or entirely); they read `tabGL Entry` meanwhile.
+	"""
+	stale = get_stale_mark(company)
+	if not stale and not is_snapshot_ready(company):
+		# Never built, so nothing reads it
+		return
+
+	if stale:
+		from_date = (
+			min(getdate(stale["from_date"]), getdate(from_date)) if stale["from_date"] and from_date else None
+		)
+
+	frappe.db.set_global(
+		SNAPSHOT_STALE_KEY.format(company),
+		json.dumps({"from_date": str(from_date) if from_date else None, "marked_at": str(now_datetime())}),
+	)
+	frappe.defaults.clear_default(SNAPSHOT_READY_KEY.format(company), parent="__global")
+
+
+def get_stale_mark(company):
+	stale = frappe.db.get_global(SNAPSHOT_STALE_KEY.format(company))
+	return json.loads(stale) if stale else None
+
+
+def rebuild_stale_snapshots():
+	"""Hourly scheduler job: rebuild the snapshots marked stale once their reposts are done."""
+	settled = add_to_date(now_datetime(), minutes=-REPOST_SETTLE_MINUTES)
+
+	for company in frappe.get_all("Company", pluck="name"):
+		stale = get_stale_mark(company)
+		if not stale or get_datetime(stale["marked_at"]) > settled or has_pending_reposts(company):
+			continue
+
+		rebuild(company=company, from_date=stale["from_date"])
+		if get_stale_mark(company) == stale:
+			frappe.defaults.clear_default(SNAPSHOT_STALE_KEY.format(company), parent="__global")
+		else:
+			# Another repost was submitted during the rebuild; the next run picks it up
+			frappe.defaults.clear_default(SNAPSHOT_READY_KEY.format(company), parent="__global")
+		frappe.db.commit()
+
+		# Cached Account Inquiry and Segment-Wise Trial Balance results may predate the repost
+		report_cache.clear(company=company)
+
+
+def has_pending_reposts(company):
+	return bool(
+		frappe.db.exists(
+			"Repost Item Valuation",
+			{"company": company, "docstatus": 1, "status": ("in", ("Queued", "In Progress"))},
+		)
+	)
+
+
+def rebuild(company=None, from_date=None):
+	"""
+	Regenerate snapshot rows from `tabGL Entry`, one company at a time.
+
+	With ``from_date`` only months starting on or after that date's month are rebuilt.
+	"""
+	companies = [company] if company else frappe.get_all("Company", pluck="name")
+	period_from = get_first_day(from_date) if from_date else None
+
+	for company in companies:
+		date_cond = "AND period_start >= %(period_from)s" if period_from else ""
+		gl_date_cond = "AND posting_date >= %(period_from)s" if period_from else ""
+		params = {
+			"company": company,
+			"period_from": period_from,
+			"timestamp": now(),
+			"user": frappe.session.user,
+		}
+
+		frappe.db.sql(
+			f"DELETE FROM `tabGL Monthly Balance` WHERE company = %(company)s {date_cond}",
+			params,
+		)
+		frappe.db.sql(
+			f"""
+			INSERT INTO `tabGL Monthly Balance`
+				(name, creation, modified, modified_by, owner, docstatus,
+				company, account, cost_center, location, finance_book, is_opening, account_currency,
+				period_start, debit, credit, debit_in_account_currency, credit_in_account_currency)
+			SELECT
+				MD5(CONCAT_WS('|', company, account, cost_center, location, finance_book, is_opening,
+					DATE_FORMAT(period_start, '%%Y-%%m'))),
+				%(timestamp)s, %(timestamp)s, %(user)s, %(user)s, 0,
+				company, NULLIF(account, ''), NULLIF(cost_center, ''), NULLIF(location, ''),
+				NULLIF(finance_book, ''), is_opening, MAX(account_currency), period_start,
+				SUM(debit), SUM(credit), SUM(debit_in_account_currency), SUM(credit_in_account_currency)
+			FROM (
+				SELECT company, IFNULL(account, '') AS account, IFNULL(cost_center, '') AS cost_center,
+					IFNULL(location, '') AS location, IFNULL(finance_book, '') AS finance_book,
+					IFNULL(NULLIF(is_opening, ''), 'No') AS is_opening, account_currency,
+					DATE_FORMAT(posting_date, '%%Y-%%m-01') AS period_start,
+					debit, credit, debit_in_account_currency, credit_in_account_currency
+				FROM `tabGL Entry`
+				WHERE company = %(company)s {gl_date_cond}
+			) gle
+			GROUP BY company, account, cost_center, location, finance_book, is_opening, period_start
+			""",
+			params,
+		)
+		frappe.db.set_global(SNAPSHOT_READY_KEY.format(company), 1)
+		frappe.db.commit()
@@ -0,0 +1,55 @@
+# Copyright (c) 2026, example.com and contributors
+# For license information, please see license.txt
+
+from unittest.mock import patch
+
+import frappe
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from frappe.tests.utils import FrappeTestCase
+
+from custom_accounting.custom_accounting.doctype.gl_monthly_balance import gl_monthly_balance
+
+COMPANY = "_Test Company"
+ACCOUNT = "_Test Bank - _TC"
+
+
+def get_balance(doctype, date_field):
+	return frappe.db.sql(
+		f"""
+		select ifnull(sum(debit - credit), 0)
+		from `tab{doctype}`
+		where company = %s and account = %s and {date_field} between '2024-04-01' and '2024-04-30'
+		""",
+		(COMPANY, ACCOUNT),
+	)[0][0]
+
+
+class TestGLMonthlyBalance(FrappeTestCase):
+	def test_gl_rows_deleted_without_hooks_are_rebuilt(self):
+		journal_entry = make_journal_entry(
+			ACCOUNT, "_Test Cash - _TC", 100, posting_date="2024-04-15", submit=True
+		)
+		frappe.db.set_global(gl_monthly_balance.SNAPSHOT_READY_KEY.format(COMPANY), 1)
+
+		# What a repost does: GL rows go with plain SQL, so no GL Entry hook runs
+		gl_monthly_balance.mark_snapshot_stale_for_repost(
+			frappe._dict(doctype="Repost Item Valuation", company=COMPANY, posting_date="2024-04-15")
+		)
+		frappe.db.delete("GL Entry", {"voucher_type": "Journal Entry", "voucher_no": journal_entry.name})
+
+		self.assertFalse(gl_monthly_balance.is_snapshot_ready(COMPANY))
+		self.assertNotEqual(
+			get_balance("GL Monthly Balance", "period_start"), get_balance("GL Entry", "posting_date")
+		)
+
+		with (
+			patch.object(gl_monthly_balance, "REPOST_SETTLE_MINUTES", 0),
+			patch.object(frappe.db, "commit"),
+		):
+			gl_monthly_balance.rebuild_stale_snapshots()
+
+		self.assertTrue(gl_monthly_balance.is_snapshot_ready(COMPANY))
+		self.assertIsNone(gl_monthly_balance.get_stale_mark(COMPANY))
+		self.assertEqual(
+			get_balance("GL Monthly Balance", "period_start"), get_balance("GL Entry", "posting_date")
+		)
@@ -0,0 +1,26 @@
+import frappe
+
+# Voucher types whose custom_item is copied onto their GL Entries
+CUSTOM_ITEM_DOCTYPES = ("Sales Invoice", "Purchase Invoice", "Payment Entry")
+
+
+def set_custom_fields(doc, method=None):
+	"""
+	Stamp custom_item and the supplier bill_no onto a GL Entry as it is posted, so the
+	General Ledger can read them without joining the invoice tables.
+	"""
+	if doc.voucher_type in CUSTOM_ITEM_DOCTYPES:
+		doc.custom_item = get_voucher_value(doc.voucher_type, doc.voucher_no, "custom_item")
+
+	if doc.against_voucher and doc.against_voucher_type == "Purchase Invoice":
+		doc.custom_bill_no = get_voucher_value("Purchase Invoice", doc.against_voucher, "bill_no")
+
+
+def get_voucher_value(doctype, name, fieldname):
+	# A voucher posts all of its GL Entries in a row, so remembering the last lookup per
+	# field saves a query for every entry after the first
+	cache = frappe.flags.setdefault("gl_entry_voucher_values", {})
+	key = (doctype, name)
+	if fieldname not in cache or cache[fieldname][0] != key:
+		cache[fieldname] = (key, frappe.db.get_value(doctype, name, fieldname))
+	return cache[fieldname][1]
@@ -0,0 +1,227 @@
+"""
+Bulk creation and renaming of Locations.
+
+Location names are derived from the location number, name and company abbreviation (see
+`naming_series.set_location_name`). Both tools read the company abbreviations once and compute
+every name up front. Renames move the Location and every link to it (Account, Cost Center, GL
+Entry, ...) with one set-based UPDATE per table, inside the caller's transaction, and re-key the
+GL Monthly Balance rows of the renamed Locations.
+"""
+
+import frappe
+from frappe import _
+from frappe.model.dynamic_links import get_dynamic_link_map
+from frappe.model.rename_doc import get_link_fields
+
+from custom_accounting.custom_accounting.account.account_tree_balances import clear_tree_balances
+from custom_accounting.custom_accounting.account.account_tree_index import clear_account_tree_index
+from custom_accounting.custom_accounting.account.chart_import import order_parents_first, parse_rows
+from custom_accounting.custom_accounting.account.cost_center_index import clear_cost_center_index
+from custom_accounting.custom_accounting.doctype.gl_monthly_balance.gl_monthly_balance import (
+	rekey_snapshot_rows,
+)
+from custom_accounting.custom_accounting.naming.naming_series import make_location_name
+from custom_accounting.custom_accounting.report import report_cache
+
+UPDATE_CHUNK_SIZE = 1000
+
+# Row keys accepted by both tools and the Location fields they set
+LOCATION_FIELDS = {
+	"location_name": "location_name",
+	"location_number": "custom_location_number",
+	"company": "custom_company",
+}
+
+
+def get_company_abbrs():
+	return dict(frappe.get_all("Company", fields=["name", "abbr"], as_list=True))
+
+
+@frappe.whitelist()
+def import_locations(data):
+	"""
+	Create Locations from ``data`` (a JSON list of rows, or CSV text with a header row) with
+	location_name, location_number, company and optionally parent_location and is_group.
+	"""
+	frappe.has_permission("Location", "create", throw=True)
+
+	rows = parse_rows(data)
+	company_abbrs = get_company_abbrs()
+	existing = set(frappe.get_all("Location", pluck="name"))
+	new = {}
+
+	for idx, row in enumerate(rows, 1):
+		if not row.get("location_name"):
+			frappe.throw(_("Row {0}: Location Name is required").format(idx))
+		if row.get("company") and row.company not in company_abbrs:
+			frappe.throw(_("Row {0}: Company {1} not found").format(idx, frappe.bold(row.company)))
+
+		row.name = make_location_name(
+			row.get("location_number"), row.location_name, company_abbrs.get(row.get("company")) or ""
+		)
+		if row.name in existing or row.name in new:
+			frappe.throw(_("Row {0}: Location {1} already exists").format(idx, frappe.bold(row.name)))
+		new[row.name] = idx - 1
+
+	# A parent may come later in the file; order_parents_first moves it ahead of its children
+	for idx, row in enumerate(rows, 1):
+		row.parent_row = new.get(row.get("parent_location"))
+		if row.get("parent_location") and row.parent_row is None and row.parent_location not in existing:
+			frappe.throw(
+				_("Row {0}: Parent Location {1} not found").format(idx, frappe.bold(row.parent_location))
+			)
+
+	created = []
+	for row in order_parents_first(rows):
+		location = frappe.get_doc(
+			{
+				"doctype": "Location",
+				"parent_location": row.get("parent_location") or None,
+				"is_group": row.get("is_group") or 0,
+				**{field: row.get(key) for key, field in LOCATION_FIELDS.items() if row.get(key)},
+			}
+		)
+		location.insert()
+		created.append(location.name)
+
+	return created
+
+
+@frappe.whitelist()
+def rename_locations(company=None, updates=None):
+	"""
+	Re-derive Location names and move every link to the new names.
+
+	``updates`` is an optional list of rows with a Location ``name`` and new location_name,
+	location_number or company values; without it, names are re-derived from the current
+	fields, e.g. after a company abbreviation change. Only Locations of ``company`` are
+	considered when it is set. Returns ``{old name: new name}``.
+	"""
+	frappe.only_for("System Manager")
+
+	filters = {"custom_company": company} if company else {}
+	locations = {
+		d.name: d
+		for d in frappe.get_all(
+			"Location",
+			filters=filters,
+			fields=["name", "location_name", "custom_location_number", "custom_company"],
+		)
+	}
+
+	field_updates = {}
+	for idx, row in enumerate(parse_rows(updates) if updates else [], 1):
+		location = locations.get(row.get("name"))
+		if not location:
+			frappe.throw(_("Row {0}: Location {1} not found").format(idx, frappe.bold(row.get("name"))))
+
+		for key, field in LOCATION_FIELDS.items():
+			if key in row and row[key] != location[field]:
+				location[field] = row[key] or None
+				field_updates.setdefault(field, {})[location.name] = location[field]
+
+	company_abbrs = get_company_abbrs()
+	renames = {}
+	for name, location in locations.items():
+		new_name = make_location_name(
+			location.custom_location_number,
+			location.location_name,
+			company_abbrs.get(location.custom_company) or "",
+		)
+		if new_name != name:
+			renames[name] = new_name
+
+	validate_renames(renames)
+
+	for field, values in field_updates.items():
+		update_values("Location", field, values, key_field="name")
+
+	if renames:
+		update_links(renames)
+		update_values("Location", "name", renames)
+		# The snapshot's location column moved with the other links, but its row names hash the old one
+		rekey_snapshot_rows(renames.values())
+
+		for clear_cache in (
+			clear_account_tree_index,
+			clear_cost_center_index,
+			clear_tree_balances,
+			report_cache.clear,
+		):
+			frappe.db.after_commit.add(clear_cache)
+
+	return renames
+
+
+def validate_renames(renames):
+	all_names = set(frappe.get_all("Location", pluck="name"))
+	final_names = {}
+
+	for name in all_names:
+		new_name = renames.get(name, name)
+		if new_name in final_names:
+			frappe.throw(
+				_("Locations {0} and {1} would both be named {2}").format(
+					frappe.bold(final_names[new_name]), frappe.bold(name), frappe.bold(new_name)
+				)
+			)
+		final_names[new_name] = name
+
+	# Renames are applied in chunks, so a new name must not be another Location's current one
+	for name, new_name in renames.items():
+		if new_name in renames:
+			frappe.throw(
+				_(
+					"Location {0} would take the name of {1}, which is also being renamed; rename them in separate runs"
+				).format(frappe.bold(name), frappe.bold(new_name))
+			)
+
+
+def update_links(renames):
+	tables = set(frappe.db.get_tables())
+
+	for df in get_link_fields("Location"):
+		if df.issingle:
+			update_values(
+				"Singles",
+				"value",
+				renames,
+				condition="doctype = %(doctype)s and field = %(field)s",
+				params={"doctype": df.parent, "field": df.fieldname},
+			)
+		elif f"tab{df.parent}" in tables:
+			update_values(df.parent, df.fieldname, renames)
+
+	for df in get_dynamic_link_map().get("Location", []):
+		if not df.issingle and f"tab{df.parent}" in tables:
+			update_values(df.parent, df.fieldname, renames, condition=f"`{df.options}` = 'Location'")
+
+
+def update_values(doctype, fieldname, values, key_field=None, condition=None, params=None):
+	"""
+	``UPDATE `tab{doctype}` SET fieldname = values[key_field]`` for the rows whose ``key_field``
+	(``fieldname`` itself by default) is in ``values``, ``UPDATE_CHUNK_SIZE`` keys at a time.
+	"""
+	key_field = key_field or fieldname
+	items = list(values.items())
+
+	for start in range(0, len(items), UPDATE_CHUNK_SIZE):
+		chunk = items[start : start + UPDATE_CHUNK_SIZE]
+		chunk_params = dict(params or {})
+		whens = []
+		for idx, (key, value) in enumerate(chunk):
+			chunk_params[f"key_{idx}"] = key
+			chunk_params[f"value_{idx}"] = value
+			whens.append(f"when %(key_{idx})s then %(value_{idx})s")
+
+		keys = ", ".join(f"%(key_{idx})s" for idx in range(len(chunk)))
+		cases = " ".join(whens)
+		extra_condition = f"and {condition}" if condition else ""
+		frappe.db.sql(
+			f"""
+			update `tab{doctype}`
+			set `{fieldname}` = case `{key_field}` {cases} end
+			where `{key_field}` in ({keys}) {extra_condition}
+			""",
+			chunk_params,
+		)
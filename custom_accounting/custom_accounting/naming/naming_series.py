@@ -4,23 +4,25 @@ def set_location_name(doc, method):
     company_abbr = ""
     
     if doc.custom_company:
-        company_abbr = frappe.db.get_value("Company", doc.custom_company, "abbr") or ""
-    
+        company_abbr = frappe.get_cached_value("Company", doc.custom_company, "abbr") or ""
+
+    doc.name = make_location_name(doc.custom_location_number, doc.location_name, company_abbr)
+
+
+def make_location_name(location_number, location_name, company_abbr):
     parts = []
 
     # Custom location number
-    if doc.custom_location_number:
-        parts.append(doc.custom_location_number)
+    if location_number:
+        parts.append(location_number)
 
     # Location Name (don't use doc.name!)
-    if doc.location_name:
-        parts.append(doc.location_name)
+    if location_name:
+        parts.append(location_name)
 
     # Company abbreviation
     if company_abbr:
         parts.append(company_abbr)
 
     # Final naming format
-    new_name = " - ".join(parts)
-
-    doc.name = new_name
+    return " - ".join(parts)
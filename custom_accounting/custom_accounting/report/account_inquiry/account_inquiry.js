@@ -1,3 +1,5 @@
+{% include "custom_accounting/public/js/report/background_result.js" %}
+
 frappe.query_reports["Account Inquiry"] = {
     filters: [
         {
@@ -164,10 +166,14 @@ frappe.query_reports["Account Inquiry"] = {
         return default_formatter(value, row, column, data, indent);
     },
 
+    onload: function (report) {
+        custom_accounting.report.setup_background_result(report);
+    },
+
     // onload: function (report) {
     //     // reset location when cost center changes
     //     frappe.query_report.get_filter('cost_center').on_change = () => {
     //         frappe.query_report.set_filter_value('location', '');
     //     };
     // }
-};
\ No newline at end of file
+};
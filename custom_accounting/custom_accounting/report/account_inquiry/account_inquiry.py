@@ -1,14 +1,44 @@
 import frappe
 from frappe import _
-from frappe.utils import flt, getdate, get_last_day, add_months, get_first_day
-from datetime import datetime
+from frappe.utils import flt, getdate
+from datetime import date, datetime
 from dateutil.relativedelta import relativedelta
 
+from custom_accounting.custom_accounting.doctype.gl_monthly_balance.gl_monthly_balance import (
+    is_snapshot_ready,
+)
+from custom_accounting.custom_accounting.report.background import (
+    estimate_gl_rows,
+    get_background_result,
+)
+from custom_accounting.custom_accounting.report.report_cache import cached_report
+from custom_accounting.custom_accounting.report.utils import (
+    get_budget_index,
+    get_gl_month_buckets,
+    get_period_ranges,
+    split_buckets_by_period,
+)
 
+
+REPORT_NAME = "Account Inquiry"
+
+
+def get_cache_range(filters):
+    return filters.get("company"), get_scan_from_date(filters), filters.get("to_date")
+
+
+@cached_report(REPORT_NAME, get_cache_range)
 def execute(filters=None):
     filters = frappe._dict(filters or {})
     validate_filters(filters)
 
+    # Large runs are prepared in the background and loaded by the report's JS
+    background = get_background_result(
+        REPORT_NAME, filters, get_columns(filters), lambda: estimate_report_rows(filters)
+    )
+    if background:
+        return background
+
     group_by = filters.get("group_by") or "Month"
 
     # Build periods based on grouping
@@ -66,6 +96,26 @@ def validate_filters(filters):
             frappe.throw(_("Selected Cost Center's location does not match the selected Location"))
 
 
+def get_scan_from_date(filters):
+    """First date the report reads GL postings from; YTD figures start on January 1."""
+    if not filters.get("from_date"):
+        return None
+
+    from_date = getdate(filters.from_date)
+    if filters.get("currency_type") == "YTD Converted":
+        from_date = date(from_date.year, 1, 1)
+    return from_date
+
+
+def estimate_report_rows(filters):
+    return estimate_gl_rows(
+        filters.company,
+        get_scan_from_date(filters),
+        filters.to_date,
+        use_snapshot=not filters.get("voucher_type") and is_snapshot_ready(filters.company),
+    )
+
+
 # -----------------------------
 # Period Generators
 # -----------------------------
@@ -103,6 +153,44 @@ def get_years_between(from_date, to_date):
 # -----------------------------
 # Data Builder
 # -----------------------------
+KEY_FIELDS = ("account", "cost_center", "location", "account_currency")
+
+
+def get_conditions(filters):
+    conditions = []
+    params = {
+        "company": filters.company,
+        "account": filters.get("account"),
+        "currency": filters.get("currency"),
+    }
+    if filters.get("cost_center"):
+        conditions.append("AND cost_center = %(cost_center)s")
+        params["cost_center"] = filters.cost_center
+    elif filters.get("location"):
+        conditions.append("""
+            AND cost_center IN (
+                SELECT name FROM `tabCost Center`
+                WHERE company = %(company)s AND custom_location = %(location)s AND is_group = 0
+            )
+            """)
+
+    if filters.get("location"):
+        conditions.append("AND location = %(location)s")
+        params["location"] = filters.location
+
+    if filters.get("account"):
+        conditions.append("AND account = %(account)s")
+    if filters.get("currency"):
+        conditions.append("AND account_currency = %(currency)s")
+
+    # Optional voucher_type filter (e.g., to show only 'Sales Invoice', exclude 'Payment Entry')
+    if filters.get("voucher_type"):
+        conditions.append("AND voucher_type = %(voucher_type)s")
+        params["voucher_type"] = filters.voucher_type
+
+    return "\n".join(conditions), params
+
+
 def get_data(filters, periods, group_by):
     data = []
     grand_totals = {"debit": 0, "credit": 0, "variance": 0, "balance": 0}
@@ -110,100 +198,34 @@ def get_data(filters, periods, group_by):
     last_header = None
     is_ytd = filters.get("currency_type") == "YTD Converted"
 
-    for period in periods:
-        if group_by == "Month":
-            period_start = datetime.strptime(period, "%b %Y")
-            period_end = get_last_day(period_start)
-        elif group_by == "Quarter":
-            q, year = period.split()
-            q_num = int(q[1])
-            period_start = datetime(int(year), (q_num - 1) * 3 + 1, 1)
-            period_end = add_months(period_start, 3) - relativedelta(days=1)
-        else:
-            year = int(period)
-            period_start = datetime(year, 1, 1)
-            period_end = datetime(year, 12, 31)
-
-        # Dynamic filters
-        cost_center_filter = ""
-        location_filter = ""
-        params_base = {
-            "company": filters.company,
-            "account": filters.get("account"),
-            "currency": filters.get("currency"),
-        }
-        if filters.get("cost_center"):
-            cost_center_filter = "AND cost_center = %(cost_center)s"
-            params_base["cost_center"] = filters.cost_center
-        elif filters.get("location"):
-            cost_center_filter = """
-            AND cost_center IN (
-                SELECT name FROM `tabCost Center`
-                WHERE company = %(company)s AND custom_location = %(location)s AND is_group = 0
-            )
-            """
-            params_base["location"] = filters.location
-
-        if filters.get("location"):
-            location_filter = "AND location = %(location)s"
-            if "location" not in params_base:
-                params_base["location"] = filters.location
-
-        account_cond = "AND account = %(account)s" if filters.get("account") else ""
-        currency_cond = "AND account_currency = %(currency)s" if filters.get("currency") else ""
-        
-        # Optional voucher_type filter (e.g., to show only 'Sales Invoice', exclude 'Payment Entry')
-        voucher_cond = ""
-        if filters.get("voucher_type"):
-            voucher_cond = "AND voucher_type = %(voucher_type)s"
-            params_base["voucher_type"] = filters.voucher_type
-
-        # Compute period activity for accumulation (always period-specific)
-        activity_params = params_base.copy()
-        activity_params["from_date"] = period_start
-        activity_params["to_date"] = period_end
-        activity_query = f"""
-            SELECT SUM(debit) AS debit_total, SUM(credit) AS credit_total
-            FROM `tabGL Entry`
-            WHERE company = %(company)s
-                AND posting_date BETWEEN %(from_date)s AND %(to_date)s
-                {account_cond}
-                {cost_center_filter}
-                {location_filter}
-                {currency_cond}
-                {voucher_cond}
-        """
-        activity_data = frappe.db.sql(activity_query, activity_params)
-        period_activity_debit = flt(activity_data[0][0]) if activity_data else 0
-        period_activity_credit = flt(activity_data[0][1]) if activity_data else 0
-        grand_totals["debit"] += period_activity_debit
-        grand_totals["credit"] += period_activity_credit
-
-        # Compute display values (YTD or period)
-        if is_ytd:
-            report_from = get_first_day(datetime(period_start.year, 1, 1))
-        else:
-            report_from = period_start
-
-        display_params = params_base.copy()
-        display_params["from_date"] = report_from
-        display_params["to_date"] = period_end
-        gl_entries_query = f"""
-            SELECT account, cost_center, location, account_currency, SUM(debit) AS debit, SUM(credit) AS credit
-            FROM `tabGL Entry`
-            WHERE company = %(company)s
-                AND posting_date BETWEEN %(from_date)s AND %(to_date)s
-                {account_cond}
-                {cost_center_filter}
-                {location_filter}
-                {currency_cond}
-                {voucher_cond}
-            GROUP BY account, cost_center, location, account_currency
-            """
-        gl_entries = frappe.db.sql(gl_entries_query, display_params, as_dict=True)
-
-        period_debit = sum(flt(e.debit) for e in gl_entries)
-        period_credit = sum(flt(e.credit) for e in gl_entries)
+    period_ranges = get_period_ranges(periods, group_by)
+    if not period_ranges:
+        return data, grand_totals
+
+    # One scan over the whole reporting window, bucketed by month; periods are folded in Python
+    conditions, params = get_conditions(filters)
+    first_start = period_ranges[0][1]
+    params["from_date"] = date(first_start.year, 1, 1) if is_ytd else first_start
+    params["to_date"] = period_ranges[-1][2]
+    # The monthly snapshot carries every key field, but not voucher_type
+    use_snapshot = not filters.get("voucher_type") and is_snapshot_ready(filters.company)
+    buckets = get_gl_month_buckets(KEY_FIELDS, conditions, params, use_snapshot=use_snapshot)
+    period_rows, activity = split_buckets_by_period(buckets, KEY_FIELDS, period_ranges, ytd=is_ytd)
+
+    budget_index = {}
+    if filters.get("show_variance"):
+        budget_index = get_budget_index(filters.company, get_fiscal_year(filters.from_date))
+
+    for idx, (period, period_start, period_end) in enumerate(period_ranges):
+        grand_totals["debit"] += activity[idx].debit
+        grand_totals["credit"] += activity[idx].credit
+
+        # Display values are YTD or period-only depending on currency_type
+        report_from = date(period_start.year, 1, 1) if is_ytd else period_start
+        gl_entries = period_rows[idx]
+
+        period_debit = sum(e.debit for e in gl_entries.values())
+        period_credit = sum(e.credit for e in gl_entries.values())
         period_balance = period_debit - period_credit
 
         header = {
@@ -223,16 +245,16 @@ def get_data(filters, periods, group_by):
 
         data.append(header)
 
-        for e in gl_entries:
+        for (account, cost_center, location, _currency), e in gl_entries.items():
             balance = flt(e.debit) - flt(e.credit)
             row = {
-                "name": e.account,
+                "name": account,
                 "parent": period,
                 "indent": 1,
                 "is_group": 0,
-                "account": e.account,
-                "cost_center": e.cost_center,
-                "location": e.location,
+                "account": account,
+                "cost_center": cost_center,
+                "location": location,
                 "debit": flt(e.debit),
                 "credit": flt(e.credit),
                 "balance": flt(balance),
@@ -240,7 +262,7 @@ def get_data(filters, periods, group_by):
                 "report_to": period_end.strftime("%Y-%m-%d"),
             }
             if filters.get("show_variance"):
-                variance = compute_variance(e.account, e.cost_center, filters, balance, report_from, period_end)
+                variance = compute_variance(budget_index, account, cost_center, balance, report_from, period_end)
                 row["variance"] = variance
                 header["variance"] += variance
             data.append(row)
@@ -262,28 +284,11 @@ def get_data(filters, periods, group_by):
 # -----------------------------
 # Variance Logic
 # -----------------------------
-def compute_variance(account, cost_center, filters, actual_balance, period_start, period_end):
-    fiscal_year = get_fiscal_year(filters.from_date)
-    budget_data = frappe.db.sql(
-        """
-        SELECT COALESCE(SUM(budget_amount), 0) AS total_budget
-        FROM `tabBudget Account`
-        WHERE account = %s
-          AND parent IN (
-              SELECT name FROM `tabBudget`
-              WHERE cost_center = %s AND fiscal_year = %s
-          )
-        """,
-        (account, cost_center or None, fiscal_year),
-        as_dict=True,
-    )
-    if not budget_data:
+def compute_variance(budget_index, account, cost_center, actual_balance, period_start, period_end):
+    total_budget = budget_index.get((account, cost_center), 0)
+    if not total_budget:
         return actual_balance  # No budget, variance = actual
 
-    total_budget = flt(budget_data[0].total_budget)
-    if total_budget == 0:
-        return actual_balance
-
     # Prorate budget to period/YTD (assume even annual distribution over 12 months)
     dist = 12
     period_months = (period_end.year - period_start.year) * 12 + (period_end.month - period_start.month) + 1
@@ -0,0 +1,179 @@
+import gzip
+import hashlib
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import add_to_date, cint, now_datetime
+
+REPORT_EXECUTE = {
+	"Account Inquiry": "custom_accounting.custom_accounting.report.account_inquiry.account_inquiry.execute",
+	"Segment-Wise Trial Balance": (
+		"custom_accounting.custom_accounting.report.segment_wise_trial_balance.segment_wise_trial_balance.execute"
+	),
+}
+
+# Site config `custom_report_background_threshold` overrides the estimated row count above which
+# a run is sent to the background
+BACKGROUND_ROW_THRESHOLD = 300000
+RESULT_TTL_MINUTES = 30
+
+
+def get_filters_hash(report_name, filters):
+	"""Hash of the report and its non-empty filters, independent of key order."""
+	filters = {key: value for key, value in filters.items() if value not in (None, "", [])}
+	payload = json.dumps({"report": report_name, "filters": filters}, sort_keys=True, default=str)
+	return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def estimate_gl_rows(company, from_date, to_date, use_snapshot=False):
+	"""Row estimate from the optimizer for the date range a report scans; no rows are read."""
+	if use_snapshot:
+		table, date_field = "`tabGL Monthly Balance`", "period_start"
+	else:
+		table, date_field = "`tabGL Entry`", "posting_date"
+
+	plan = frappe.db.sql(
+		f"""
+		EXPLAIN SELECT name FROM {table}
+		WHERE company = %(company)s AND {date_field} BETWEEN %(from_date)s AND %(to_date)s
+		""",
+		{"company": company, "from_date": from_date, "to_date": to_date},
+		as_dict=True,
+	)
+	return max((cint(d.rows) for d in plan), default=0)
+
+
+def get_background_result(report_name, filters, columns, estimate_rows):
+	"""
+	Result of a large run prepared in the background, or None when the report should run inline.
+
+	``estimate_rows`` is only called when no prepared result exists for these filters. When it
+	is over the threshold the run is queued and a placeholder is returned, which the report's
+	JS recognises by its ``data-background-result`` attribute and polls until it is ready.
+	"""
+	if frappe.flags.in_background_report:
+		return None
+
+	filters_hash = get_filters_hash(report_name, filters)
+	result = frappe.db.get_value(
+		"Custom Report Result",
+		{
+			"report_name": report_name,
+			"filters_hash": filters_hash,
+			"owner": frappe.session.user,
+			"creation": (">=", add_to_date(now_datetime(), minutes=-RESULT_TTL_MINUTES)),
+		},
+		["name", "status", "report_end_time", "error_message"],
+		as_dict=True,
+		order_by="creation desc",
+	)
+
+	if result and result.status == "Completed":
+		prepared = load_result(result.name)
+		message = _("Prepared in the background at {0}").format(
+			frappe.format(result.report_end_time, "Datetime")
+		)
+		return prepared["columns"], prepared["result"], message
+
+	if result and result.status in ("Queued", "Started"):
+		return columns, [], get_pending_message(result.name)
+
+	if result and result.status == "Error":
+		# Shown once; the next refresh queues a fresh run
+		frappe.delete_doc("Custom Report Result", result.name, ignore_permissions=True)
+		error_lines = (result.error_message or "").strip().splitlines()
+		return (
+			columns,
+			[],
+			_("Preparing the report in the background failed: {0}").format(
+				error_lines[-1] if error_lines else ""
+			),
+		)
+
+	threshold = cint(frappe.conf.get("custom_report_background_threshold")) or BACKGROUND_ROW_THRESHOLD
+	estimated_rows = estimate_rows()
+	if estimated_rows <= threshold:
+		return None
+
+	result = frappe.get_doc(
+		{
+			"doctype": "Custom Report Result",
+			"report_name": report_name,
+			"status": "Queued",
+			"company": filters.get("company"),
+			"estimated_rows": estimated_rows,
+			"filters_hash": filters_hash,
+			"filters": frappe.as_json(filters),
+		}
+	).insert(ignore_permissions=True)
+
+	frappe.enqueue(
+		"custom_accounting.custom_accounting.report.background.run_background_report",
+		queue="long",
+		timeout=3600,
+		result_name=result.name,
+		enqueue_after_commit=True,
+	)
+
+	return columns, [], get_pending_message(result.name)
+
+
+def get_pending_message(result_name):
+	message = _("This report covers a large number of entries and is being prepared in the background.")
+	return f'<span data-background-result="{result_name}">{message}</span>'
+
+
+def run_background_report(result_name):
+	result = frappe.get_doc("Custom Report Result", result_name)
+	result.db_set("status", "Started", commit=True)
+
+	frappe.flags.in_background_report = True
+	try:
+		execute = frappe.get_attr(REPORT_EXECUTE[result.report_name])
+		columns, data = execute(frappe._dict(json.loads(result.filters)))[:2]
+
+		content = gzip.compress(frappe.as_json({"columns": columns, "result": data}, indent=None).encode())
+		frappe.get_doc(
+			{
+				"doctype": "File",
+				"file_name": f"{result.name}.json.gz",
+				"attached_to_doctype": "Custom Report Result",
+				"attached_to_name": result.name,
+				"content": content,
+				"is_private": 1,
+			}
+		).insert(ignore_permissions=True)
+
+		result.db_set({"status": "Completed", "report_end_time": now_datetime()})
+	except Exception:
+		frappe.db.rollback()
+		result.db_set({"status": "Error", "error_message": frappe.get_traceback()})
+		frappe.log_error(title=_("Background report failed: {0}").format(result.report_name))
+	finally:
+		frappe.flags.in_background_report = False
+
+
+def load_result(result_name):
+	file_name = frappe.db.get_value(
+		"File", {"attached_to_doctype": "Custom Report Result", "attached_to_name": result_name}, "name"
+	)
+	content = frappe.get_doc("File", file_name).get_content()
+	return json.loads(gzip.decompress(content))
+
+
+@frappe.whitelist()
+def get_result_status(result_name):
+	return frappe.db.get_value(
+		"Custom Report Result", {"name": result_name, "owner": frappe.session.user}, "status"
+	)
+
+
+def delete_old_results():
+	"""Daily scheduler job: results are only served for RESULT_TTL_MINUTES."""
+	for name in frappe.get_all(
+		"Custom Report Result",
+		filters={"creation": ("<", add_to_date(now_datetime(), days=-1))},
+		pluck="name",
+	):
+		frappe.delete_doc("Custom Report Result", name, ignore_permissions=True)
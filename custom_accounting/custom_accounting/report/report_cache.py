@@ -0,0 +1,273 @@
+"""
+Result cache for the custom reports.
+
+Results are kept in Redis per report, normalized filters and permission scope (roles and user
+permissions), so users who see the same data share entries. The number of entries is bounded
+and the least recently used ones are evicted first. Entries also record the company and date
+range they depend on, and posting or cancelling a GL Entry drops the ones it falls into.
+
+Identical runs that are in flight at the same time are coalesced: the first one takes a short
+Redis lock and the others wait for its result instead of running the same queries.
+"""
+
+import functools
+import hashlib
+import json
+import time
+import uuid
+
+import frappe
+from frappe.utils import cint, getdate
+
+from custom_accounting.custom_accounting.report.background import get_filters_hash
+
+CACHE_PREFIX = "custom_accounting:report_cache"
+LRU_KEY = f"{CACHE_PREFIX}:lru"
+CACHED_REPORTS = ("Account Inquiry", "Segment-Wise Trial Balance", "General Ledger")
+
+# Site config `custom_report_cache_size` overrides the number of entries kept
+REPORT_CACHE_SIZE = 200
+REPORT_CACHE_TTL = 60 * 60
+MAX_CACHED_ROWS = 50000
+
+# Followers stop waiting once the leader's lock expires and run the report themselves
+COALESCE_LOCK_TIMEOUT = 120
+COALESCE_RESULT_TTL = 60
+
+
+def cached_report(report_name, get_cache_range):
+	"""
+	Decorate a report's ``execute`` so its result is served from the cache when possible.
+
+	``get_cache_range(filters)`` returns ``(company, from_date, to_date)``: the GL postings the
+	result depends on. ``from_date`` is None when earlier postings matter too, e.g. for openings.
+	"""
+
+	def decorator(execute):
+		@functools.wraps(execute)
+		def wrapper(filters=None):
+			if not filters:
+				return execute(filters)
+
+			cache_key = get_cache_key(report_name, filters)
+			company, from_date, to_date = get_cache_range(frappe._dict(filters))
+			if not company or not to_date:
+				return run_coalesced(cache_key, lambda: execute(filters))
+
+			member = f"{company}|{cache_key}"
+
+			result = frappe.cache.get_value(get_entry_key(cache_key))
+			if result is not None:
+				touch_entry(member)
+				count_lookup(report_name, "hits")
+				return result
+
+			count_lookup(report_name, "misses")
+			result = run_coalesced(cache_key, lambda: execute(filters))
+
+			# Results that carry a message (background placeholders, prepared runs) are not cached
+			if len(result) == 2 and get_row_count(result) <= MAX_CACHED_ROWS:
+				set_entry(cache_key, member, company, from_date, to_date, result)
+
+			return result
+
+		return wrapper
+
+	return decorator
+
+
+def run_coalesced(cache_key, run):
+	"""
+	Run the report once for concurrent identical requests.
+
+	The leader holds ``lock`` while it runs and hands its result over through ``result`` for a
+	short while; followers register in ``waiters``, poll for the result and fall back to running
+	the report themselves if the lock goes away without a result (the leader failed or timed out).
+
+	A result left over from an earlier run is dropped when the lock is taken, so followers only
+	ever see the current leader's result. Results too large to cache are only handed over when
+	a follower is waiting for them.
+	"""
+	lock = frappe.cache.make_key(f"{CACHE_PREFIX}:lock:{cache_key}")
+	waiters = frappe.cache.make_key(f"{CACHE_PREFIX}:waiters:{cache_key}")
+	result_key = get_inflight_key(cache_key)
+	token = uuid.uuid4().hex
+
+	if not frappe.cache.set(lock, token, nx=True, ex=COALESCE_LOCK_TIMEOUT):
+		frappe.cache.incr(waiters)
+		frappe.cache.expire(waiters, COALESCE_LOCK_TIMEOUT)
+		result = wait_for_leader(lock, result_key)
+		if result is not None:
+			return result
+
+		return run()
+
+	frappe.cache.delete_value(result_key)
+	frappe.cache.delete(waiters)
+
+	try:
+		result = run()
+		if get_row_count(result) <= MAX_CACHED_ROWS or frappe.cache.get(waiters) is not None:
+			frappe.cache.set_value(result_key, result, expires_in_sec=COALESCE_RESULT_TTL)
+		return result
+	finally:
+		if frappe.safe_decode(frappe.cache.get(lock)) == token:
+			frappe.cache.delete(lock)
+
+
+def wait_for_leader(lock, result_key):
+	deadline = time.monotonic() + COALESCE_LOCK_TIMEOUT
+	interval = 0.1
+
+	while time.monotonic() < deadline:
+		time.sleep(interval)
+		interval = min(interval * 2, 1)
+
+		# expires=True skips the request-local cache, which would keep returning the first miss
+		result = frappe.cache.get_value(result_key, expires=True)
+		if result is not None:
+			return result
+
+		if frappe.cache.get(lock) is None:
+			return frappe.cache.get_value(result_key, expires=True)
+
+	return None
+
+
+def get_row_count(result):
+	return len(result[1]) if len(result) > 1 and result[1] else 0
+
+
+def get_cache_key(report_name, filters):
+	return hashlib.sha256(
+		f"{get_filters_hash(report_name, filters)}|{get_permission_scope()}".encode()
+	).hexdigest()
+
+
+def get_permission_scope():
+	user = frappe.session.user
+	scope = [sorted(frappe.get_roles(user)), frappe.permissions.get_user_permissions(user)]
+	return hashlib.sha256(json.dumps(scope, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_entry_key(cache_key):
+	return f"{CACHE_PREFIX}:entry:{cache_key}"
+
+
+def get_inflight_key(cache_key):
+	return f"{CACHE_PREFIX}:inflight:{cache_key}"
+
+
+def get_company_index_key(company):
+	return f"{CACHE_PREFIX}:company:{company}"
+
+
+def set_entry(cache_key, member, company, from_date, to_date, result):
+	frappe.cache.set_value(get_entry_key(cache_key), result, expires_in_sec=REPORT_CACHE_TTL)
+	frappe.cache.hset(
+		get_company_index_key(company),
+		cache_key,
+		(getdate(from_date) if from_date else None, getdate(to_date)),
+	)
+	touch_entry(member)
+	evict_entries()
+
+
+def touch_entry(member):
+	frappe.cache.zadd(frappe.cache.make_key(LRU_KEY), {member: time.time()})
+
+
+def evict_entries():
+	size = cint(frappe.conf.get("custom_report_cache_size")) or REPORT_CACHE_SIZE
+	lru_key = frappe.cache.make_key(LRU_KEY)
+
+	excess = frappe.cache.zcard(lru_key) - size
+	if excess <= 0:
+		return
+
+	for member in frappe.cache.zrange(lru_key, 0, excess - 1):
+		company, cache_key = frappe.safe_decode(member).rsplit("|", 1)
+		delete_entry(company, cache_key)
+
+
+def delete_entry(company, cache_key):
+	frappe.cache.delete_value(get_entry_key(cache_key))
+	frappe.cache.hdel(get_company_index_key(company), cache_key)
+	frappe.cache.zrem(frappe.cache.make_key(LRU_KEY), f"{company}|{cache_key}")
+
+
+def invalidate(company, posting_date):
+	"""Drop the cached results of ``company`` whose date range includes ``posting_date``."""
+	posting_date = getdate(posting_date)
+
+	for cache_key, (from_date, to_date) in frappe.cache.hgetall(get_company_index_key(company)).items():
+		# Hash field names come back from Redis as bytes
+		cache_key = frappe.safe_decode(cache_key)
+		if (not from_date or from_date <= posting_date) and posting_date <= to_date:
+			delete_entry(company, cache_key)
+			frappe.cache.delete_value(get_inflight_key(cache_key))
+
+
+def clear(company=None):
+	"""Drop every cached result of ``company``, or of all companies."""
+	companies = [company] if company else frappe.get_all("Company", pluck="name")
+
+	for company in companies:
+		for cache_key in frappe.cache.hkeys(get_company_index_key(company)):
+			cache_key = frappe.safe_decode(cache_key)
+			delete_entry(company, cache_key)
+			frappe.cache.delete_value(get_inflight_key(cache_key))
+
+
+def invalidate_for_gl_entry(doc, method=None):
+	"""
+	`doc_events` handler for GL Entry posting and deletion; cancellations post reversing entries.
+
+	Runs once per company and posting date after the transaction commits, so a report run
+	in between cannot cache the pre-commit ledger.
+	"""
+	pending = frappe.flags.report_cache_pending_invalidations
+	if pending is None:
+		pending = frappe.flags.report_cache_pending_invalidations = set()
+
+	key = (doc.company, getdate(doc.posting_date))
+	if key in pending:
+		return
+	pending.add(key)
+
+	def run_invalidation():
+		pending.discard(key)
+		invalidate(*key)
+
+	frappe.db.after_commit.add(run_invalidation)
+	frappe.db.after_rollback.add(lambda: pending.discard(key))
+
+
+def count_lookup(report_name, outcome):
+	frappe.cache.incr(frappe.cache.make_key(f"{CACHE_PREFIX}:{outcome}:{report_name}"))
+
+
+@frappe.whitelist()
+def get_report_cache_stats():
+	"""Hit and miss counts per report and the number of cached entries."""
+	frappe.only_for("System Manager")
+
+	stats = {}
+	for report_name in CACHED_REPORTS:
+		counts = {
+			outcome: cint(
+				frappe.safe_decode(
+					frappe.cache.get(frappe.cache.make_key(f"{CACHE_PREFIX}:{outcome}:{report_name}"))
+				)
+			)
+			for outcome in ("hits", "misses")
+		}
+		lookups = counts["hits"] + counts["misses"]
+		counts["hit_rate"] = round(counts["hits"] / lookups, 4) if lookups else 0
+		stats[report_name] = counts
+
+	return {
+		"reports": stats,
+		"entries": frappe.cache.zcard(frappe.cache.make_key(LRU_KEY)),
+		"size": cint(frappe.conf.get("custom_report_cache_size")) or REPORT_CACHE_SIZE,
+	}
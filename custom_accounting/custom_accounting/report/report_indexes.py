@@ -0,0 +1,117 @@
+"""
+Composite indexes for the GL access patterns of the custom reports.
+
+Account Inquiry and Segment-Wise Trial Balance scan `tabGL Entry` by company and posting date,
+optionally narrowed by cost center, location, account or voucher type, and group by account,
+cost center, location and currency (see `utils.get_gl_month_buckets_query`). Account Inquiry's
+location filter also looks up leaf cost centers by company and location.
+
+The indexes are created after install and after every migrate, so ones whose columns come from
+fixtures or accounting dimensions added later are picked up once those columns exist.
+"""
+
+import click
+import frappe
+from frappe.utils import add_months, get_first_day, nowdate
+
+# (doctype, index name, columns)
+REPORT_INDEXES = (
+	# Covers the unfiltered month buckets: range on posting_date, everything else read from the index
+	(
+		"GL Entry",
+		"custom_accounting_company_posting_date",
+		[
+			"company",
+			"posting_date",
+			"account",
+			"cost_center",
+			"location",
+			"account_currency",
+			"debit",
+			"credit",
+		],
+	),
+	("GL Entry", "custom_accounting_company_cost_center", ["company", "cost_center", "posting_date"]),
+	("GL Entry", "custom_accounting_company_location", ["company", "location", "posting_date"]),
+	("GL Entry", "custom_accounting_company_account", ["company", "account", "posting_date"]),
+	# Account Inquiry reads tabGL Entry instead of the monthly snapshot when filtered by voucher type
+	("GL Entry", "custom_accounting_company_voucher_type", ["company", "voucher_type", "posting_date"]),
+	("Cost Center", "custom_accounting_company_location", ["company", "custom_location", "is_group"]),
+)
+
+
+def ensure_report_indexes():
+	"""Create the indexes in REPORT_INDEXES that do not exist yet."""
+	for doctype, index_name, columns in REPORT_INDEXES:
+		if frappe.db.has_index(f"tab{doctype}", index_name):
+			continue
+
+		missing = [column for column in columns if not frappe.db.has_column(doctype, column)]
+		if missing:
+			click.secho(
+				f"Skipping index {index_name} on {doctype} until columns {', '.join(missing)} exist",
+				fg="yellow",
+			)
+			continue
+
+		frappe.db.add_index(doctype, columns, index_name)
+
+
+def check_report_indexes(company=None):
+	"""
+	EXPLAIN the reports' GL queries for ``company`` over the last twelve months and list, per
+	query and table, the index the optimizer picks and whether it is one of REPORT_INDEXES.
+	"""
+	from custom_accounting.custom_accounting.report.account_inquiry import account_inquiry
+	from custom_accounting.custom_accounting.report.segment_wise_trial_balance import (
+		segment_wise_trial_balance,
+	)
+	from custom_accounting.custom_accounting.report.utils import get_gl_month_buckets_query
+
+	company = company or frappe.defaults.get_global_default("company")
+	sample = (
+		frappe.db.get_value(
+			"GL Entry",
+			{"company": company, "is_cancelled": 0},
+			["account", "cost_center", "location", "voucher_type"],
+			as_dict=True,
+		)
+		or frappe._dict()
+	)
+
+	cases = [
+		("Account Inquiry", account_inquiry, {}),
+		("Account Inquiry by Cost Center", account_inquiry, {"cost_center": sample.cost_center}),
+		("Account Inquiry by Location", account_inquiry, {"location": sample.location}),
+		("Account Inquiry by Account", account_inquiry, {"account": sample.account}),
+		("Account Inquiry by Voucher Type", account_inquiry, {"voucher_type": sample.voucher_type}),
+		("Segment-Wise Trial Balance", segment_wise_trial_balance, {}),
+	]
+
+	to_date = nowdate()
+	report_indexes = {(f"tab{doctype}", index_name) for doctype, index_name, _columns in REPORT_INDEXES}
+	tables = {f"tab{doctype}" for doctype, _index_name, _columns in REPORT_INDEXES}
+
+	results = []
+	for label, report, filters in cases:
+		conditions, params = report.get_conditions(frappe._dict(company=company, **filters))
+		params.update({"from_date": add_months(get_first_day(to_date), -11), "to_date": to_date})
+
+		plan = frappe.db.sql(
+			"EXPLAIN " + get_gl_month_buckets_query(report.KEY_FIELDS, conditions), params, as_dict=True
+		)
+		for row in plan:
+			if row.table not in tables:
+				continue
+
+			results.append(
+				frappe._dict(
+					query=label,
+					table=row.table,
+					key=row.key,
+					rows=row.rows,
+					uses_report_index=(row.table, row.key) in report_indexes,
+				)
+			)
+
+	return results
@@ -1,13 +1,11 @@
 # Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
 # License: GNU General Public License v3. See license.txt
 
-import copy
 from collections import OrderedDict
 
 import frappe
 from frappe import _, _dict
-from frappe.query_builder import Criterion
-from frappe.utils import cstr, getdate
+from frappe.utils import add_days, cint, cstr, flt, get_first_day, getdate
 
 from erpnext import get_company_currency, get_default_company
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
@@ -15,21 +13,45 @@ from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 	get_dimension_with_children,
 )
 from erpnext.accounts.report.financial_statements import get_cost_centers_with_children
-from erpnext.accounts.report.utils import convert_to_presentation_currency, get_currency
-from erpnext.accounts.utils import get_account_currency
+from erpnext.accounts.report.utils import convert, convert_to_presentation_currency, get_currency
+
+from custom_accounting.custom_accounting.account.account_index import get_account_index
+from custom_accounting.custom_accounting.doctype.gl_monthly_balance.gl_monthly_balance import (
+	is_snapshot_ready,
+)
+from custom_accounting.custom_accounting.report.report_cache import cached_report
+
+
+LEDGER_PAGE_LENGTH = 500
+
+
+def get_cache_range(filters):
+	# Openings make every earlier posting relevant
+	return filters.get("company"), None, filters.get("to_date")
 
 
+@cached_report("General Ledger", get_cache_range)
 def execute(filters=None):
 	if not filters:
 		return [], []
 
-	account_details = {}
+	filters, account_details = prepare_filters(filters)
+
+	columns = get_columns(filters)
+
+	if filters.get("load_in_pages"):
+		return columns, get_ledger_page_rows(filters, None, LEDGER_PAGE_LENGTH)["rows"]
+
+	res = get_result(filters, account_details)
 
+	return columns, res
+
+
+def prepare_filters(filters):
 	if filters and filters.get("print_in_account_currency") and not filters.get("account"):
 		frappe.throw(_("Select an account to print in account currency"))
 
-	for acc in frappe.db.sql("""select name, is_group from tabAccount""", as_dict=1):
-		account_details.setdefault(acc.name, acc)
+	account_details = get_account_index(filters.get("company"))
 
 	if filters.get("party"):
 		filters.party = frappe.parse_json(filters.get("party"))
@@ -40,11 +62,12 @@ def execute(filters=None):
 
 	filters = set_account_currency(filters)
 
-	columns = get_columns(filters)
-
-	res = get_result(filters, account_details)
+	if filters.get("include_default_book_entries"):
+		filters["company_fb"] = frappe.get_cached_value(
+			"Company", filters.get("company"), "default_finance_book"
+		)
 
-	return columns, res
+	return filters, account_details
 
 
 def validate_filters(filters, account_details):
@@ -96,6 +119,11 @@ def set_account_currency(filters):
 		account_currency = None
 
 		if filters.get("account"):
+			account_index = get_account_index(filters.company)
+
+			def get_account_currency(account):
+				return account_index[account].account_currency or filters.company_currency
+
 			if len(filters.get("account")) == 1:
 				account_currency = get_account_currency(filters.account[0])
 			else:
@@ -137,26 +165,429 @@ def get_result(filters, account_details):
 	if filters.get("include_dimensions"):
 		accounting_dimensions = get_accounting_dimensions()
 
+	from custom_accounting.custom_accounting.report.report_override import general_ledger_columnar
+
+	if general_ledger_columnar.can_use_columnar_aggregation(filters):
+		return general_ledger_columnar.get_result(filters, accounting_dimensions)
+
 	gl_entries = get_gl_entries(filters, accounting_dimensions)
 
-	data = get_data_with_opening_closing(filters, account_details, accounting_dimensions, gl_entries)
+	data = get_data_with_opening_closing(filters, account_details, gl_entries)
 
 	result = get_result_as_list(data, filters)
 
 	return result
 
 
+@frappe.whitelist()
+def get_ledger_page(filters, cursor=None, page_length=LEDGER_PAGE_LENGTH):
+	"""
+	One page of the ledger, laid out like the full report: the same blank, Opening, Total and
+	Closing rows per group, with the balance restarting at each of them.
+
+	Entries are read in the keyset order of `get_ledger_page_order` after ``cursor``, which
+	carries the sort key of the last entry already shown, the group it belongs to with that
+	group's opening, total and running balance, and the report's opening and total so far.
+	The report's Opening row comes with the first page, a group's Total and Closing rows with
+	the page its last entry is on, and the report's Total and Closing rows with the last page.
+	"""
+	if not frappe.get_cached_doc("Report", "General Ledger").is_permitted():
+		frappe.throw(_("You don't have access to Report: {0}").format(_("General Ledger")), frappe.PermissionError)
+
+	filters, _account_details = prepare_filters(frappe._dict(frappe.parse_json(filters)))
+	cursor = frappe._dict(frappe.parse_json(cursor)) if cursor else None
+
+	return get_ledger_page_rows(filters, cursor, min(cint(page_length) or LEDGER_PAGE_LENGTH, 5000))
+
+
+def get_ledger_page_rows(filters, cursor, page_length):
+	accounting_dimensions = []
+	if filters.get("include_dimensions"):
+		accounting_dimensions = get_accounting_dimensions()
+
+	group_by = filters.get("group_by")
+	consolidated = group_by == "Group by Voucher (Consolidated)"
+	group_field = None if consolidated else group_by_field(group_by)
+
+	# Same rules as get_data_with_opening_closing
+	show_group_opening = (not group_by and not filters.get("voucher_no")) or (
+		group_by and group_by != "Group by Voucher"
+	)
+	show_group_total = group_by or not filters.get("voucher_no")
+
+	load_opening = needs_opening_balances(filters)
+	filter_conditions = get_filter_conditions(filters)
+	opening_condition, entry_condition = get_period_opening_conditions(filters)
+
+	currency_map = None
+	if filters.get("presentation_currency"):
+		currency_map = get_currency(filters)
+		currency_map["single_currency"] = (
+			cursor.single_currency
+			if cursor
+			else has_single_account_currency(filters, filter_conditions, load_opening)
+		)
+
+	order = get_ledger_page_order(filters, accounting_dimensions)
+	entries = get_ledger_page_entries(
+		filters,
+		accounting_dimensions,
+		[*filter_conditions, *get_date_conditions(filters), entry_condition],
+		order,
+		cursor,
+		page_length + 1,
+	)
+
+	has_more = len(entries) > page_length
+	next_entry = entries[page_length] if has_more else None
+	entries = convert_page_rows(entries[:page_length], currency_map)
+
+	rows = []
+	totals = get_totals_dict()
+	group = None
+
+	def add_row(row, balance=0):
+		row["balance"] = get_balance(row, balance, "debit", "credit")
+		rows.append(row)
+		return row["balance"]
+
+	if cursor:
+		totals.opening.add(_dict(cursor.opening))
+		totals.total.add(_dict(cursor.total))
+		balance = flt(cursor.balance)
+
+		if "group" in cursor:
+			group = _dict(value=cursor.group, totals=get_totals_dict())
+			group.totals.opening.add(_dict(cursor.group_opening))
+			group.totals.total.add(_dict(cursor.group_total))
+	else:
+		for row in get_ledger_page_opening(
+			filters, filter_conditions, load_opening, opening_condition, currency_map
+		):
+			totals.opening.add(row)
+		balance = add_row(totals.opening.as_dict())
+
+	group_openings = {}
+	if group_field:
+		group_values = {cstr(gle.get(group_field)) for gle in entries}
+		if group:
+			group_values.discard(group.value)
+		group_openings = get_ledger_page_group_openings(
+			filters,
+			filter_conditions,
+			group_field,
+			group_values,
+			load_opening,
+			opening_condition,
+			currency_map,
+		)
+
+	def close_group():
+		group.totals.closing.add(group.totals.opening)
+		group.totals.closing.add(group.totals.total)
+
+		if show_group_total:
+			add_row(group.totals.total.as_dict())
+		if show_group_opening:
+			add_row(group.totals.closing.as_dict())
+
+	if consolidated and filters.get("show_net_values_in_party_account"):
+		account_type_map = get_account_type_map(filters.get("company"))
+
+	for gle in entries:
+		if consolidated:
+			if filters.get("show_net_values_in_party_account"):
+				set_net_values(gle, account_type_map)
+
+		elif not group or cstr(gle.get(group_field)) != group.value:
+			if group:
+				close_group()
+
+			group = _dict(value=cstr(gle.get(group_field)), totals=get_totals_dict())
+			if group.value in group_openings:
+				group.totals.opening.add(group_openings[group.value])
+
+			balance = add_row({"debit_in_transaction_currency": None, "credit_in_transaction_currency": None})
+			if show_group_opening:
+				balance = add_row(group.totals.opening.as_dict())
+
+		if group:
+			group.totals.total.add(gle)
+		totals.total.add(gle)
+		balance = add_row(gle, balance)
+
+	# The next entry tells whether the last group ends on this page
+	if group and (not next_entry or cstr(next_entry.get(group_field)) != group.value):
+		close_group()
+		group = None
+
+	next_cursor = None
+	if has_more:
+		last = entries[-1]
+		next_cursor = {
+			# Nullable sort fields are compared through ifnull(field, ''), so as strings
+			"key": [
+				last.get(field) if expression == field else cstr(last.get(field))
+				for expression, field in order
+			],
+			"balance": balance,
+			"opening": totals.opening.as_dict(),
+			"total": totals.total.as_dict(),
+		}
+		if group:
+			next_cursor.update(
+				group=group.value,
+				group_opening=group.totals.opening.as_dict(),
+				group_total=group.totals.total.as_dict(),
+			)
+		if currency_map:
+			next_cursor["single_currency"] = currency_map["single_currency"]
+	else:
+		if not consolidated:
+			add_row({"debit_in_transaction_currency": None, "credit_in_transaction_currency": None})
+
+		totals.closing.add(totals.opening)
+		totals.closing.add(totals.total)
+		add_row(totals.total.as_dict())
+		add_row(totals.closing.as_dict())
+
+	for row in rows:
+		row["account_currency"] = filters.account_currency
+
+	# The report view reads the cursor to continue from off its last row
+	if next_cursor:
+		rows[-1]["ledger_page_cursor"] = next_cursor
+
+	return {"rows": rows, "cursor": next_cursor}
+
+
+def get_ledger_page_order(filters, accounting_dimensions):
+	"""
+	Keyset order of the paged ledger as (SQL expression, row field) pairs.
+
+	The rows of a group are contiguous in it, so a group can be closed as soon as the next row
+	belongs to another one. Group by Account keeps the full report's order; vouchers and
+	parties come in voucher and party order rather than in the order of their first row.
+	"""
+	group_by = filters.get("group_by")
+
+	if group_by == "Group by Voucher (Consolidated)":
+		key_fields = get_consolidated_key_fields(filters, accounting_dimensions)
+		fields = ["posting_date", "account", *[f for f in key_fields if f not in ("posting_date", "account")]]
+		return [(f if f in ("posting_date", "creation") else f"ifnull({f}, '')", f) for f in fields]
+
+	if group_by == "Group by Account":
+		order = [("account", "account"), ("posting_date", "posting_date"), ("creation", "creation")]
+	elif group_by == "Group by Party":
+		order = [
+			("ifnull(party, '')", "party"),
+			("posting_date", "posting_date"),
+			("account", "account"),
+			("creation", "creation"),
+		]
+	else:
+		order = [
+			("posting_date", "posting_date"),
+			("voucher_type", "voucher_type"),
+			("voucher_no", "voucher_no"),
+			("account", "account"),
+			("creation", "creation"),
+		]
+
+	return [*order, ("name", "gl_entry")]
+
+
+def get_ledger_page_entries(filters, accounting_dimensions, conditions, order, cursor, limit):
+	select_list = get_select_list(filters, accounting_dimensions)
+	group_by_statement = ""
+	if filters.get("group_by") == "Group by Voucher (Consolidated)":
+		select_list, group_by_statement = get_consolidated_select(filters, accounting_dimensions)
+
+	conditions = list(conditions)
+	params = dict(filters, page_length=limit)
+	if cursor:
+		conditions.append(
+			"({}) > ({})".format(
+				", ".join(expression for expression, _field in order),
+				", ".join(f"%(after_{i})s" for i in range(len(order))),
+			)
+		)
+		params.update({f"after_{i}": value for i, value in enumerate(cursor.key)})
+
+	return frappe.db.sql(
+		f"""
+		select {select_list}
+		from `tabGL Entry`
+		where company=%(company)s {format_conditions(conditions)}
+		{group_by_statement}
+		order by {", ".join(expression for expression, _field in order)}
+		limit %(page_length)s
+	""",
+		params,
+		as_dict=1,
+	)
+
+
+def get_period_opening_conditions(filters):
+	"""
+	Conditions splitting the ledger query's rows into the ones `get_accountwise_gle` sums into
+	the opening and the ones it lists as entries.
+	"""
+	if filters.get("show_opening_entries"):
+		return "posting_date < %(from_date)s", "posting_date >= %(from_date)s"
+
+	return (
+		"(posting_date < %(from_date)s or is_opening = 'Yes')",
+		"posting_date >= %(from_date)s and ifnull(is_opening, 'No') != 'Yes'",
+	)
+
+
+def get_ledger_page_opening(filters, filter_conditions, load_opening, opening_condition, currency_map):
+	rows = []
+	if load_opening:
+		rows += get_opening_rows(filters, filter_conditions, None)
+
+	rows += get_ledger_amounts(
+		filters, [*filter_conditions, *get_date_conditions(filters), opening_condition]
+	)
+
+	return convert_page_rows(rows, currency_map)
+
+
+def get_ledger_page_group_openings(
+	filters, filter_conditions, group_field, group_values, load_opening, opening_condition, currency_map
+):
+	"""Opening of each group in ``group_values``, as {group value: GLTotalRow}."""
+	if not group_values:
+		return {}
+
+	rows = []
+	opening_group_field = get_opening_group_field(filters)
+	if load_opening and opening_group_field:
+		rows += get_opening_rows(filters, filter_conditions, opening_group_field, group_values)
+
+	rows += get_ledger_amounts(
+		filters,
+		[*filter_conditions, *get_date_conditions(filters), opening_condition],
+		group_field,
+		group_values,
+	)
+
+	openings = {}
+	for row in convert_page_rows(rows, currency_map):
+		value = cstr(row.get(group_field))
+		if value not in openings:
+			openings[value] = get_totals_dict().opening
+		openings[value].add(row)
+
+	return openings
+
+
+def get_ledger_amounts(filters, conditions, group_field=None, group_values=None):
+	"""Debit and credit sums of the rows matching ``conditions`` per account currency and group."""
+	group_select = f"ifnull({group_field}, '') as group_value," if group_field else ""
+	group_by = f"{group_field}, account_currency" if group_field else "account_currency"
+
+	params = filters
+	if group_values:
+		conditions = [*conditions, f"ifnull({group_field}, '') in %(group_values)s"]
+		params = dict(filters, group_values=list(group_values))
+
+	amounts = frappe.db.sql(
+		f"""
+		select {group_select} account_currency,
+			sum(debit) as debit, sum(credit) as credit,
+			sum(debit_in_account_currency) as debit_in_account_currency,
+			sum(credit_in_account_currency) as credit_in_account_currency
+		from `tabGL Entry`
+		where company=%(company)s {format_conditions(conditions)}
+		group by {group_by}
+	""",
+		params,
+		as_dict=1,
+	)
+
+	rows = []
+	for d in amounts:
+		row = _dict(
+			account_currency=d.account_currency,
+			debit=flt(d.debit),
+			credit=flt(d.credit),
+			debit_in_account_currency=flt(d.debit_in_account_currency),
+			credit_in_account_currency=flt(d.credit_in_account_currency),
+		)
+		if group_field:
+			row[group_field] = d.group_value
+		rows.append(row)
+
+	return rows
+
+
+def has_single_account_currency(filters, filter_conditions, load_opening):
+	"""Whether the rows the full report converts to the presentation currency share one account currency."""
+	date_conditions = [" and ".join(get_date_conditions(filters))]
+	if load_opening:
+		date_conditions.append(" and ".join(get_date_conditions(filters, opening=True)))
+
+	currencies = frappe.db.sql(
+		f"""
+		select distinct account_currency
+		from `tabGL Entry`
+		where company=%(company)s {format_conditions(filter_conditions)}
+			and ({" or ".join(f"({condition})" for condition in date_conditions)})
+		limit 2
+	""",
+		filters,
+	)
+
+	return len(currencies) <= 1
+
+
+def convert_page_rows(rows, currency_map):
+	"""
+	`convert_to_presentation_currency` for the rows of one page.
+
+	It keeps account currency amounts when all of its rows share the presentation currency as
+	account currency; that is decided over the whole ledger (``single_currency``), not the page.
+	"""
+	if not currency_map or not rows:
+		return rows
+
+	presentation_currency = currency_map["presentation_currency"]
+	page_currencies = {row.account_currency for row in rows}
+	if currency_map["single_currency"] or page_currencies != {presentation_currency}:
+		return convert_to_presentation_currency(rows, currency_map)
+
+	for row in rows:
+		for field in ("debit", "credit"):
+			if row.get(field):
+				row[field] = convert(
+					flt(row[field]),
+					presentation_currency,
+					currency_map["company_currency"],
+					currency_map["report_date"],
+				)
+
+	return rows
+
+
 def get_gl_entries(filters, accounting_dimensions):
 	currency_map = get_currency(filters)
-	select_fields = """, debit, credit, debit_in_account_currency,
-		credit_in_account_currency """
+	query, filter_conditions, load_opening = get_gl_entries_query(filters, accounting_dimensions)
 
-	if filters.get("show_remarks"):
-		if remarks_length := frappe.db.get_single_value("Accounts Settings", "general_ledger_remarks_length"):
-			select_fields += f",substr(remarks, 1, {remarks_length}) as 'remarks'"
-		else:
-			select_fields += """,remarks"""
+	gl_entries = frappe.db.sql(query, filters, as_dict=1)
+
+	if load_opening:
+		gl_entries = add_opening_balances(filters, filter_conditions, gl_entries)
 
+	if filters.get("presentation_currency"):
+		return convert_to_presentation_currency(gl_entries, currency_map)
+	else:
+		return gl_entries
+
+
+def get_gl_entries_query(filters, accounting_dimensions):
+	"""Ledger query, the filter conditions it was built from and whether openings must be added."""
 	order_by_statement = "order by posting_date, account, creation"
 
 	if filters.get("include_dimensions"):
@@ -167,10 +598,33 @@ def get_gl_entries(filters, accounting_dimensions):
 	if filters.get("group_by") == "Group by Account":
 		order_by_statement = "order by account, posting_date, creation"
 
-	if filters.get("include_default_book_entries"):
-		filters["company_fb"] = frappe.get_cached_value(
-			"Company", filters.get("company"), "default_finance_book"
-		)
+	# Checked before get_filter_conditions expands filters.account
+	load_opening = needs_opening_balances(filters)
+	filter_conditions = get_filter_conditions(filters)
+
+	select_list = get_select_list(filters, accounting_dimensions)
+	group_by_statement = ""
+
+	if filters.get("group_by") == "Group by Voucher (Consolidated)":
+		select_list, group_by_statement = get_consolidated_select(filters, accounting_dimensions)
+
+	query = f"""
+		select {select_list}
+		from `tabGL Entry`
+		where company=%(company)s {format_conditions(filter_conditions + get_date_conditions(filters))}
+		{group_by_statement}
+		{order_by_statement}
+	"""
+
+	return query, filter_conditions, load_opening
+
+
+def get_select_list(filters, accounting_dimensions):
+	select_fields = """, debit, credit, debit_in_account_currency,
+		credit_in_account_currency """
+
+	if remarks_field := get_remarks_field(filters):
+		select_fields += f",{remarks_field} as 'remarks'"
 
 	dimension_fields = ""
 	if accounting_dimensions:
@@ -182,84 +636,304 @@ def get_gl_entries(filters, accounting_dimensions):
 			"debit_in_transaction_currency, credit_in_transaction_currency, transaction_currency,"
 		)
 
-	gl_entries = frappe.db.sql(
-		f"""
-		select
+	return f"""
 			name as gl_entry, posting_date, account, party_type, party,
 			voucher_type, voucher_subtype, voucher_no, {dimension_fields}
 			cost_center, project, {transaction_currency_fields}
 			against_voucher_type, against_voucher, account_currency,
-			against, is_opening, creation {select_fields}
-		from `tabGL Entry`
-		where company=%(company)s {get_conditions(filters)}
-		{order_by_statement}
-	""",
-		filters,
-		as_dict=1,
-	)
+			against, is_opening, creation, custom_item, ifnull(custom_bill_no, '') as bill_no {select_fields}"""
+
+
+def get_remarks_field(filters):
+	if not filters.get("show_remarks"):
+		return ""
+
+	if remarks_length := frappe.db.get_single_value("Accounts Settings", "general_ledger_remarks_length"):
+		return f"substr(remarks, 1, {remarks_length})"
+	return "remarks"
+
+
+def get_consolidated_select(filters, accounting_dimensions):
+	"""
+	Select list and GROUP BY for "Group by Voucher (Consolidated)".
+
+	Rows sharing the consolidation key are summed by the database, so only one row per key is
+	returned and `get_accountwise_gle` lists them as they are. is_opening is part of the key so
+	opening rows can still be told apart; the remaining columns take the value of one of the
+	grouped rows.
+	"""
+	key_fields = get_consolidated_key_fields(filters, accounting_dimensions)
+
+	def any_value(field, expression=None):
+		if field in key_fields:
+			return field
+		return f"min({expression or field}) as {field}"
+
+	def total(field):
+		return f"sum({field}) as {field}"
+
+	fields = [
+		"min(name) as gl_entry",
+		"posting_date",
+		"account",
+		"party_type",
+		"party",
+		"voucher_type",
+		any_value("voucher_subtype"),
+		"voucher_no",
+		*[any_value(dimension) for dimension in accounting_dimensions],
+		any_value("cost_center"),
+		any_value("project"),
+	]
 
-	# Fetch custom_item mappings
-	if filters.get("company"):
-		si_map, pi_map, pe_map = get_custom_item_map(filters.company)
-		for gle in gl_entries:
-			if gle.voucher_type == "Sales Invoice":
-				gle["custom_item"] = si_map.get(gle.voucher_no)
-			elif gle.voucher_type == "Purchase Invoice":
-				gle["custom_item"] = pi_map.get(gle.voucher_no)
-			elif gle.voucher_type == "Payment Entry":
-				gle["custom_item"] = pe_map.get(gle.voucher_no)
-			else:
-				gle["custom_item"] = None
+	if filters.get("add_values_in_transaction_currency"):
+		fields += [
+			total("debit_in_transaction_currency"),
+			total("credit_in_transaction_currency"),
+			any_value("transaction_currency"),
+		]
 
-	if filters.get("presentation_currency"):
-		return convert_to_presentation_currency(gl_entries, currency_map)
-	else:
-		return gl_entries
+	fields += [
+		any_value("against_voucher_type"),
+		"group_concat(nullif(against_voucher, '') order by creation separator ', ') as against_voucher",
+		any_value("account_currency"),
+		any_value("against"),
+		"is_opening",
+		any_value("creation"),
+		any_value("custom_item"),
+		"ifnull(min(custom_bill_no), '') as bill_no",
+		*[total(field) for field in ("debit", "credit", "debit_in_account_currency", "credit_in_account_currency")],
+	]
 
+	if remarks_field := get_remarks_field(filters):
+		fields.append(any_value("remarks", remarks_field))
 
-def get_custom_item_map(company):
-	si_data = frappe.db.sql(
-		"""
-		select name, custom_item from `tabSales Invoice`
-		where docstatus = 1 and company = %s
-	""",
-		company,
-		as_dict=1,
+	return ", ".join(fields), "group by {}".format(", ".join(key_fields))
+
+
+def get_consolidated_key_fields(filters, accounting_dimensions):
+	key_fields = [
+		"posting_date",
+		"voucher_type",
+		"voucher_no",
+		"account",
+		"party_type",
+		"party",
+		"is_opening",
+	]
+	if frappe.db.get_single_value("Accounts Settings", "enable_immutable_ledger"):
+		key_fields.append("creation")
+	if filters.get("include_dimensions"):
+		key_fields += [*accounting_dimensions, "cost_center", "project"]
+
+	return key_fields
+
+
+def needs_opening_balances(filters):
+	"""Whether rows before from_date contribute to the opening (they used to be fetched for this)."""
+	return bool(
+		filters.get("account")
+		or filters.get("party")
+		or filters.get("group_by") in ["Group by Account", "Group by Party"]
 	)
-	si_map = {d.name: d.custom_item for d in si_data}
 
-	pi_data = frappe.db.sql(
-		"""
-		select name, custom_item from `tabPurchase Invoice`
-		where docstatus = 1 and company = %s
+
+def get_opening_group_field(filters):
+	"""GL field the opening is needed per; None when only the report-level opening is shown."""
+	group_by = group_by_field(filters.get("group_by"))
+	if group_by == "voucher_no" or filters.get("group_by") == "Group by Voucher (Consolidated)":
+		# A voucher's rows share its posting date, so only the report total carries an opening
+		return None
+	return group_by
+
+
+def add_opening_balances(filters, filter_conditions, gl_entries):
+	"""
+	Add one pre-aggregated row per group (and account currency) holding everything posted before
+	from_date, so `get_accountwise_gle` sees the same opening without loading the history.
+	"""
+	group_field = get_opening_group_field(filters)
+	opening_rows = get_opening_rows(filters, filter_conditions, group_field)
+
+	return merge_opening_rows(group_field, opening_rows, gl_entries, lambda gle: gle.account)
+
+
+def get_opening_rows(filters, filter_conditions, group_field, group_values=None):
+	opening_date = add_days(getdate(filters.from_date), -1)
+
+	opening_rows = []
+	for d in get_opening_balances(filters, filter_conditions, group_field, group_values):
+		row = _dict(
+			posting_date=opening_date,
+			is_opening="No",
+			account_currency=d.account_currency,
+			debit=flt(d.debit),
+			credit=flt(d.credit),
+			debit_in_account_currency=flt(d.debit_in_account_currency),
+			credit_in_account_currency=flt(d.credit_in_account_currency),
+		)
+		if group_field:
+			row[group_field] = d.group_value
+		opening_rows.append(row)
+
+	return opening_rows
+
+
+def merge_opening_rows(group_field, opening_rows, gl_entries, get_account):
+	if group_field != "account":
+		return opening_rows + gl_entries
+
+	# Keep the account ordering of the main query: each opening row goes just before the
+	# first in-range row of its account
+	pending = OrderedDict()
+	for row in opening_rows:
+		pending.setdefault(get_account(row), []).append(row)
+
+	merged = []
+	for gle in gl_entries:
+		merged += pending.pop(get_account(gle), [])
+		merged.append(gle)
+	for rows in pending.values():
+		merged += rows
+
+	return merged
+
+
+def get_opening_balances(filters, filter_conditions, group_field, group_values=None):
+	"""
+	Sums of the rows before from_date per ``group_field`` and account currency, for the groups
+	in ``group_values`` only when given.
+	"""
+	group_select = f"{group_field} as group_value," if group_field else "null as group_value,"
+	group_by = f"{group_field}, account_currency" if group_field else "account_currency"
+
+	params = filters
+	if group_values:
+		filter_conditions = [*filter_conditions, f"ifnull({group_field}, '') in %(group_values)s"]
+		params = dict(filters, group_values=list(group_values))
+
+	if can_use_snapshot_for_opening(filters, group_field):
+		return get_snapshot_opening_balances(filters, filter_conditions, group_field, params)
+
+	return frappe.db.sql(
+		f"""
+		select
+			{group_select} account_currency,
+			sum(debit) as debit, sum(credit) as credit,
+			sum(debit_in_account_currency) as debit_in_account_currency,
+			sum(credit_in_account_currency) as credit_in_account_currency
+		from `tabGL Entry`
+		where company=%(company)s {format_conditions(filter_conditions + get_date_conditions(filters, opening=True))}
+		group by {group_by}
+		order by min(posting_date), min(creation)
 	""",
-		company,
+		params,
 		as_dict=1,
 	)
-	pi_map = {d.name: d.custom_item for d in pi_data}
 
-	pe_data = frappe.db.sql(
-		"""
-		select name, custom_item from `tabPayment Entry`
-		where docstatus = 1 and company = %s
+
+def can_use_snapshot_for_opening(filters, group_field):
+	"""The monthly snapshot only knows account, cost center, finance book and is_opening."""
+	if group_field not in (None, "account") or not is_snapshot_ready(filters.company):
+		return False
+
+	if frappe.db.get_single_value("Accounts Settings", "enable_immutable_ledger"):
+		# Reversals are then posted on the cancellation date, so cancelled pairs no longer net out per month
+		return False
+
+	for key in ("party", "party_type", "voucher_no", "against_voucher_no", "project", "ignore_err", "ignore_cr_dr_notes"):
+		if filters.get(key):
+			return False
+
+	if filters.get("group_by") == "Group by Party":
+		return False
+
+	for dimension in get_accounting_dimensions(as_list=False):
+		if dimension.document_type != "Finance Book" and filters.get(dimension.fieldname):
+			return False
+
+	from frappe.desk.reportview import build_match_conditions
+
+	return not build_match_conditions("GL Entry")
+
+
+def get_snapshot_opening_balances(filters, filter_conditions, group_field, params=None):
+	"""Closing balance at the last month boundary from the snapshot, plus GL rows since then."""
+	boundary = get_first_day(filters.from_date)
+	group_select = f"{group_field} as group_value," if group_field else "null as group_value,"
+	group_by = f"{group_field}, account_currency" if group_field else "account_currency"
+	amount_fields = """
+		sum(debit) as debit, sum(credit) as credit,
+		sum(debit_in_account_currency) as debit_in_account_currency,
+		sum(credit_in_account_currency) as credit_in_account_currency"""
+
+	conditions = [get_finance_book_condition(filters)]
+	if filters.get("account"):
+		conditions.append("account in %(account)s")
+	if filters.get("cost_center"):
+		conditions.append("cost_center in %(cost_center)s")
+	if not frappe.db.get_single_value("Accounts Settings", "ignore_is_opening_check_for_reporting"):
+		conditions.append("is_opening != 'Yes'")
+	if params and params.get("group_values"):
+		conditions.append(f"{group_field} in %(group_values)s")
+
+	params = dict(params or filters, opening_boundary=boundary)
+	balances = frappe.db.sql(
+		f"""
+		select {group_select} account_currency, {amount_fields}
+		from `tabGL Monthly Balance`
+		where company=%(company)s and period_start < %(opening_boundary)s {format_conditions(conditions)}
+		group by {group_by}
 	""",
-		company,
+		params,
 		as_dict=1,
 	)
-	pe_map = {d.name: d.custom_item for d in pe_data}
 
-	return si_map, pi_map, pe_map
+	if getdate(filters.from_date) > boundary:
+		balances += frappe.db.sql(
+			f"""
+			select {group_select} account_currency, {amount_fields}
+			from `tabGL Entry`
+			where company=%(company)s and posting_date >= %(opening_boundary)s
+				{format_conditions(filter_conditions + get_date_conditions(filters, opening=True))}
+			group by {group_by}
+		""",
+			params,
+			as_dict=1,
+		)
+
+	merged = OrderedDict()
+	for d in balances:
+		row = merged.setdefault(
+			(d.group_value, d.account_currency),
+			_dict(
+				group_value=d.group_value,
+				account_currency=d.account_currency,
+				debit=0.0,
+				credit=0.0,
+				debit_in_account_currency=0.0,
+				credit_in_account_currency=0.0,
+			),
+		)
+		for field in ("debit", "credit", "debit_in_account_currency", "credit_in_account_currency"):
+			row[field] += flt(d[field])
+
+	return list(merged.values())
 
 
 def get_conditions(filters):
-	conditions = []
+	return format_conditions(get_filter_conditions(filters) + get_date_conditions(filters))
 
-	ignore_is_opening = frappe.db.get_single_value(
-		"Accounts Settings", "ignore_is_opening_check_for_reporting"
-	)
+
+def format_conditions(conditions):
+	return "and {}".format(" and ".join(conditions)) if conditions else ""
+
+
+def get_filter_conditions(filters):
+	conditions = []
 
 	if filters.get("account"):
-		filters.account = get_accounts_with_children(filters.account)
+		filters.account = get_accounts_with_children(filters.account, filters.company)
 		if filters.account:
 			conditions.append("account in %(account)s")
 
@@ -273,38 +947,15 @@ def get_conditions(filters):
 	if filters.get("against_voucher_no"):
 		conditions.append("against_voucher=%(against_voucher_no)s")
 
-	if filters.get("ignore_err"):
-		err_journals = frappe.db.get_all(
-			"Journal Entry",
-			filters={
-				"company": filters.get("company"),
-				"docstatus": 1,
-				"voucher_type": ("in", ["Exchange Rate Revaluation", "Exchange Gain Or Loss"]),
-			},
-			as_list=True,
-		)
-		if err_journals:
-			filters.update({"voucher_no_not_in": [x[0] for x in err_journals]})
-
-	if filters.get("ignore_cr_dr_notes"):
-		system_generated_cr_dr_journals = frappe.db.get_all(
-			"Journal Entry",
-			filters={
-				"company": filters.get("company"),
-				"docstatus": 1,
-				"voucher_type": ("in", ["Credit Note", "Debit Note"]),
-				"is_system_generated": 1,
-			},
-			as_list=True,
+	if excluded_journals := get_excluded_journal_condition(filters):
+		conditions.append(
+			f"""not exists (
+				select 1 from `tabJournal Entry` je
+				where je.name = `tabGL Entry`.voucher_no
+					and je.company = %(company)s and je.docstatus = 1
+					and ({excluded_journals})
+			)"""
 		)
-		if system_generated_cr_dr_journals:
-			vouchers_to_ignore = (filters.get("voucher_no_not_in") or []) + [
-				x[0] for x in system_generated_cr_dr_journals
-			]
-			filters.update({"voucher_no_not_in": vouchers_to_ignore})
-
-	if filters.get("voucher_no_not_in"):
-		conditions.append("voucher_no not in %(voucher_no_not_in)s")
 
 	if filters.get("group_by") == "Group by Party" and not filters.get("party_type"):
 		conditions.append("party_type in ('Customer', 'Supplier')")
@@ -315,41 +966,10 @@ def get_conditions(filters):
 	if filters.get("party"):
 		conditions.append("party in %(party)s")
 
-	if not (
-		filters.get("account")
-		or filters.get("party")
-		or filters.get("group_by") in ["Group by Account", "Group by Party"]
-	):
-		if not ignore_is_opening:
-			conditions.append("(posting_date >=%(from_date)s or is_opening = 'Yes')")
-		else:
-			conditions.append("posting_date >=%(from_date)s")
-
-	if not ignore_is_opening:
-		conditions.append("(posting_date <=%(to_date)s or is_opening = 'Yes')")
-	else:
-		conditions.append("posting_date <=%(to_date)s")
-
 	if filters.get("project"):
 		conditions.append("project in %(project)s")
 
-	if filters.get("include_default_book_entries"):
-		if filters.get("finance_book"):
-			if filters.get("company_fb") and cstr(filters.get("finance_book")) != cstr(
-				filters.get("company_fb")
-			):
-				frappe.throw(
-					_("To use a different finance book, please uncheck 'Include Default FB Entries'")
-				)
-			else:
-				conditions.append("(finance_book in (%(finance_book)s, '') OR finance_book IS NULL)")
-		else:
-			conditions.append("(finance_book in (%(company_fb)s, '') OR finance_book IS NULL)")
-	else:
-		if filters.get("finance_book"):
-			conditions.append("(finance_book in (%(finance_book)s, '') OR finance_book IS NULL)")
-		else:
-			conditions.append("(finance_book in ('') OR finance_book IS NULL)")
+	conditions.append(get_finance_book_condition(filters))
 
 	if not filters.get("show_cancelled_entries"):
 		conditions.append("is_cancelled = 0")
@@ -376,49 +996,91 @@ def get_conditions(filters):
 					else:
 						conditions.append(f"{dimension.fieldname} in %({dimension.fieldname})s")
 
-	return "and {}".format(" and ".join(conditions)) if conditions else ""
+	return conditions
 
 
-def get_accounts_with_children(accounts):
-	if not isinstance(accounts, list):
-		accounts = [d.strip() for d in accounts.strip().split(",") if d]
+def get_excluded_journal_condition(filters):
+	"""Journal Entries left out by ignore_err / ignore_cr_dr_notes, as a condition on `je`."""
+	excluded = []
+
+	if filters.get("ignore_err"):
+		excluded.append("je.voucher_type in ('Exchange Rate Revaluation', 'Exchange Gain Or Loss')")
+
+	if filters.get("ignore_cr_dr_notes"):
+		excluded.append("(je.voucher_type in ('Credit Note', 'Debit Note') and je.is_system_generated = 1)")
+
+	return " or ".join(excluded)
 
-	if not accounts:
-		return
 
-	doctype = frappe.qb.DocType("Account")
-	accounts_data = (
-		frappe.qb.from_(doctype)
-		.select(doctype.lft, doctype.rgt)
-		.where(doctype.name.isin(accounts))
-		.run(as_dict=True)
+def get_date_conditions(filters, opening=False):
+	"""
+	Posting date bounds for the ledger query.
+
+	The main query is always bounded by ``from_date``; with ``opening`` the conditions select
+	the rows before it that `get_accountwise_gle` would otherwise have summed into the opening.
+	"""
+	ignore_is_opening = frappe.db.get_single_value(
+		"Accounts Settings", "ignore_is_opening_check_for_reporting"
 	)
 
-	conditions = []
-	for account in accounts_data:
-		conditions.append((doctype.lft >= account.lft) & (doctype.rgt <= account.rgt))
+	if opening:
+		if not ignore_is_opening:
+			return ["posting_date < %(from_date)s", "ifnull(is_opening, 'No') != 'Yes'"]
+		return ["posting_date < %(from_date)s"]
+
+	if not ignore_is_opening:
+		return [
+			"(posting_date >=%(from_date)s or is_opening = 'Yes')",
+			"(posting_date <=%(to_date)s or is_opening = 'Yes')",
+		]
+	return ["posting_date >=%(from_date)s", "posting_date <=%(to_date)s"]
+
+
+def get_finance_book_condition(filters):
+	if filters.get("include_default_book_entries"):
+		if filters.get("finance_book"):
+			if filters.get("company_fb") and cstr(filters.get("finance_book")) != cstr(
+				filters.get("company_fb")
+			):
+				frappe.throw(
+					_("To use a different finance book, please uncheck 'Include Default FB Entries'")
+				)
+			else:
+				return "(finance_book in (%(finance_book)s, '') OR finance_book IS NULL)"
+		else:
+			return "(finance_book in (%(company_fb)s, '') OR finance_book IS NULL)"
+	else:
+		if filters.get("finance_book"):
+			return "(finance_book in (%(finance_book)s, '') OR finance_book IS NULL)"
+		else:
+			return "(finance_book in ('') OR finance_book IS NULL)"
+
+
+def get_accounts_with_children(accounts, company):
+	if not isinstance(accounts, list):
+		accounts = [d.strip() for d in accounts.strip().split(",") if d]
 
-	return frappe.qb.from_(doctype).select(doctype.name).where(Criterion.any(conditions)).run(pluck=True)
+	if not accounts:
+		return
 
+	account_index = get_account_index(company)
+	ranges = [(account_index[d].lft, account_index[d].rgt) for d in accounts if d in account_index]
 
-def set_bill_no(gl_entries):
-	inv_details = get_supplier_invoice_details()
-	for gl in gl_entries:
-		gl["bill_no"] = inv_details.get(gl.get("against_voucher"), "")
+	return [
+		d.name for d in account_index.values() if any(lft <= d.lft and d.rgt <= rgt for lft, rgt in ranges)
+	]
 
 
-def get_data_with_opening_closing(filters, account_details, accounting_dimensions, gl_entries):
+def get_data_with_opening_closing(filters, account_details, gl_entries):
 	data = []
 	totals_dict = get_totals_dict()
 
-	set_bill_no(gl_entries)
-
 	gle_map = initialize_gle_map(gl_entries, filters, totals_dict)
 
-	totals, entries = get_accountwise_gle(filters, accounting_dimensions, gl_entries, gle_map, totals_dict)
+	totals, entries = get_accountwise_gle(filters, gl_entries, gle_map, totals_dict)
 
 	# Opening for filtered account
-	data.append(totals.opening)
+	data.append(totals.opening.as_dict())
 
 	if filters.get("group_by") != "Group by Voucher (Consolidated)":
 		for _acc, acc_dict in gle_map.items():
@@ -429,49 +1091,89 @@ def get_data_with_opening_closing(filters, account_details, accounting_dimension
 				if (not filters.get("group_by") and not filters.get("voucher_no")) or (
 					filters.get("group_by") and filters.get("group_by") != "Group by Voucher"
 				):
-					data.append(acc_dict.totals.opening)
+					data.append(acc_dict.totals.opening.as_dict())
 
 				data += acc_dict.entries
 
 				# totals
 				if filters.get("group_by") or not filters.voucher_no:
-					data.append(acc_dict.totals.total)
+					data.append(acc_dict.totals.total.as_dict())
 
 				# closing
 				if (not filters.get("group_by") and not filters.get("voucher_no")) or (
 					filters.get("group_by") and filters.get("group_by") != "Group by Voucher"
 				):
-					data.append(acc_dict.totals.closing)
+					data.append(acc_dict.totals.closing.as_dict())
 
 		data.append({"debit_in_transaction_currency": None, "credit_in_transaction_currency": None})
 	else:
 		data += entries
 
 	# totals
-	data.append(totals.total)
+	data.append(totals.total.as_dict())
 
 	# closing
-	data.append(totals.closing)
+	data.append(totals.closing.as_dict())
 
 	return data
 
 
-def get_totals_dict():
-	def _get_debit_credit_dict(label):
+class GLTotalRow:
+	"""Opening, Total or Closing figures for one group, turned into a row dict only when output."""
+
+	__slots__ = ("account", "credit", "credit_in_account_currency", "debit", "debit_in_account_currency")
+
+	def __init__(self, account, debit=0.0, credit=0.0, debit_in_account_currency=0.0, credit_in_account_currency=0.0):
+		self.account = account
+		self.debit = debit
+		self.credit = credit
+		self.debit_in_account_currency = debit_in_account_currency
+		self.credit_in_account_currency = credit_in_account_currency
+
+	def add(self, gle):
+		self.debit += gle.debit
+		self.credit += gle.credit
+		self.debit_in_account_currency += gle.debit_in_account_currency
+		self.credit_in_account_currency += gle.credit_in_account_currency
+
+	def copy(self):
+		return GLTotalRow(
+			self.account,
+			self.debit,
+			self.credit,
+			self.debit_in_account_currency,
+			self.credit_in_account_currency,
+		)
+
+	def as_dict(self):
 		return _dict(
-			account=f"'{label}'",
-			debit=0.0,
-			credit=0.0,
-			debit_in_account_currency=0.0,
-			credit_in_account_currency=0.0,
+			account=self.account,
+			debit=self.debit,
+			credit=self.credit,
+			debit_in_account_currency=self.debit_in_account_currency,
+			credit_in_account_currency=self.credit_in_account_currency,
 			debit_in_transaction_currency=None,
 			credit_in_transaction_currency=None,
 		)
 
-	return _dict(
-		opening=_get_debit_credit_dict(_("Opening")),
-		total=_get_debit_credit_dict(_("Total")),
-		closing=_get_debit_credit_dict(_("Closing (Opening + Total)")),
+
+class GLTotals:
+	__slots__ = ("closing", "opening", "total")
+
+	def __init__(self, opening, total, closing):
+		self.opening = opening
+		self.total = total
+		self.closing = closing
+
+	def copy(self):
+		return GLTotals(self.opening.copy(), self.total.copy(), self.closing.copy())
+
+
+def get_totals_dict():
+	return GLTotals(
+		opening=GLTotalRow(f"'{_('Opening')}'"),
+		total=GLTotalRow(f"'{_('Total')}'"),
+		closing=GLTotalRow(f"'{_('Closing (Opening + Total)')}'"),
 	)
 
 
@@ -489,119 +1191,78 @@ def initialize_gle_map(gl_entries, filters, totals_dict):
 	group_by = group_by_field(filters.get("group_by"))
 
 	for gle in gl_entries:
-		gle_map.setdefault(gle.get(group_by), _dict(totals=copy.deepcopy(totals_dict), entries=[]))
+		key = gle.get(group_by)
+		if key not in gle_map:
+			gle_map[key] = _dict(totals=totals_dict.copy(), entries=[])
 	return gle_map
 
 
-def get_accountwise_gle(filters, accounting_dimensions, gl_entries, gle_map, totals):
+def get_accountwise_gle(filters, gl_entries, gle_map, totals):
 	entries = []
-	consolidated_gle = OrderedDict()
 	group_by = group_by_field(filters.get("group_by"))
 	group_by_voucher_consolidated = filters.get("group_by") == "Group by Voucher (Consolidated)"
 
 	if filters.get("show_net_values_in_party_account"):
 		account_type_map = get_account_type_map(filters.get("company"))
 
-	immutable_ledger = frappe.db.get_single_value("Accounts Settings", "enable_immutable_ledger")
-
-	def update_value_in_dict(data, key, gle):
-		data[key].debit += gle.debit
-		data[key].credit += gle.credit
-
-		data[key].debit_in_account_currency += gle.debit_in_account_currency
-		data[key].credit_in_account_currency += gle.credit_in_account_currency
-
-		if filters.get("add_values_in_transaction_currency") and key not in ["opening", "closing", "total"]:
-			data[key].debit_in_transaction_currency += gle.debit_in_transaction_currency
-			data[key].credit_in_transaction_currency += gle.credit_in_transaction_currency
-
-		if filters.get("show_net_values_in_party_account") and account_type_map.get(data[key].account) in (
-			"Receivable",
-			"Payable",
-		):
-			net_value = data[key].debit - data[key].credit
-			net_value_in_account_currency = (
-				data[key].debit_in_account_currency - data[key].credit_in_account_currency
-			)
-
-			if net_value < 0:
-				dr_or_cr = "credit"
-				rev_dr_or_cr = "debit"
-			else:
-				dr_or_cr = "debit"
-				rev_dr_or_cr = "credit"
-
-			data[key][dr_or_cr] = abs(net_value)
-			data[key][dr_or_cr + "_in_account_currency"] = abs(net_value_in_account_currency)
-			data[key][rev_dr_or_cr] = 0
-			data[key][rev_dr_or_cr + "_in_account_currency"] = 0
-
-		if data[key].against_voucher and gle.against_voucher:
-			data[key].against_voucher += ", " + gle.against_voucher
-
 	from_date, to_date = getdate(filters.from_date), getdate(filters.to_date)
 	show_opening_entries = filters.get("show_opening_entries")
 
 	for gle in gl_entries:
-		group_by_value = gle.get(group_by)
-		gle.voucher_type = gle.voucher_type
+		if not group_by_voucher_consolidated:
+			group = gle_map[gle.get(group_by)]
 
 		if gle.posting_date < from_date or (cstr(gle.is_opening) == "Yes" and not show_opening_entries):
 			if not group_by_voucher_consolidated:
-				update_value_in_dict(gle_map[group_by_value].totals, "opening", gle)
-				update_value_in_dict(gle_map[group_by_value].totals, "closing", gle)
+				group.totals.opening.add(gle)
+				group.totals.closing.add(gle)
 
-			update_value_in_dict(totals, "opening", gle)
-			update_value_in_dict(totals, "closing", gle)
+			totals.opening.add(gle)
+			totals.closing.add(gle)
 
 		elif gle.posting_date <= to_date or (cstr(gle.is_opening) == "Yes" and show_opening_entries):
 			if not group_by_voucher_consolidated:
-				update_value_in_dict(gle_map[group_by_value].totals, "total", gle)
-				update_value_in_dict(gle_map[group_by_value].totals, "closing", gle)
-				update_value_in_dict(totals, "total", gle)
-				update_value_in_dict(totals, "closing", gle)
-
-				gle_map[group_by_value].entries.append(gle)
-
-			elif group_by_voucher_consolidated:
-				keylist = [
-					gle.get("posting_date"),
-					gle.get("voucher_type"),
-					gle.get("voucher_no"),
-					gle.get("account"),
-					gle.get("party_type"),
-					gle.get("party"),
-				]
-
-				if immutable_ledger:
-					keylist.append(gle.get("creation"))
-
-				if filters.get("include_dimensions"):
-					for dim in accounting_dimensions:
-						keylist.append(gle.get(dim))
-					keylist.append(gle.get("cost_center"))
-					keylist.append(gle.get("project"))
-
-				key = tuple(keylist)
-				if key not in consolidated_gle:
-					consolidated_gle.setdefault(key, gle)
-				else:
-					update_value_in_dict(consolidated_gle, key, gle)
-
-	for value in consolidated_gle.values():
-		update_value_in_dict(totals, "total", value)
-		update_value_in_dict(totals, "closing", value)
-		entries.append(value)
+				group.totals.total.add(gle)
+				group.totals.closing.add(gle)
+				totals.total.add(gle)
+				totals.closing.add(gle)
+
+				group.entries.append(gle)
+
+			else:
+				# Rows arrive already summed per consolidation key from get_consolidated_select
+				if filters.get("show_net_values_in_party_account"):
+					set_net_values(gle, account_type_map)
+
+				totals.total.add(gle)
+				totals.closing.add(gle)
+				entries.append(gle)
 
 	return totals, entries
 
 
-def get_account_type_map(company):
-	account_type_map = frappe._dict(
-		frappe.get_all("Account", fields=["name", "account_type"], filters={"company": company}, as_list=1)
-	)
+def set_net_values(row, account_type_map):
+	if account_type_map.get(row.account) not in ("Receivable", "Payable"):
+		return
 
-	return account_type_map
+	net_value = row.debit - row.credit
+	net_value_in_account_currency = row.debit_in_account_currency - row.credit_in_account_currency
+
+	if net_value < 0:
+		dr_or_cr = "credit"
+		rev_dr_or_cr = "debit"
+	else:
+		dr_or_cr = "debit"
+		rev_dr_or_cr = "credit"
+
+	row[dr_or_cr] = abs(net_value)
+	row[dr_or_cr + "_in_account_currency"] = abs(net_value_in_account_currency)
+	row[rev_dr_or_cr] = 0
+	row[rev_dr_or_cr + "_in_account_currency"] = 0
+
+
+def get_account_type_map(company):
+	return frappe._dict({d.name: d.account_type for d in get_account_index(company).values()})
 
 
 def get_result_as_list(data, filters):
@@ -619,18 +1280,6 @@ def get_result_as_list(data, filters):
 	return data
 
 
-def get_supplier_invoice_details():
-	inv_details = {}
-	for d in frappe.db.sql(
-		""" select name, bill_no from `tabPurchase Invoice`
-		where docstatus = 1 and bill_no is not null and bill_no != '' """,
-		as_dict=1,
-	):
-		inv_details[d.name] = d.bill_no
-
-	return inv_details
-
-
 def get_balance(row, balance, debit_field, credit_field):
 	balance += row.get(debit_field, 0) - row.get(credit_field, 0)
 
@@ -0,0 +1,198 @@
+"""
+Columnar aggregation for the General Ledger override.
+
+The ledger rows are fetched as tuples and their amount, date and group columns are lifted into
+NumPy arrays. Opening/total/closing figures come from grouped reductions and running balances
+from cumulative sums; a row dict is only built for entries that are displayed. Both reductions
+add in row order, so the figures match `general_ledger.get_data_with_opening_closing` exactly.
+
+Enabled with ``"general_ledger_columnar_aggregation": 1`` in site config when NumPy is installed.
+"""
+
+import copy
+from operator import itemgetter
+
+import frappe
+from frappe.utils import getdate
+
+from custom_accounting.custom_accounting.report.report_override.general_ledger import (
+	execute,
+	get_gl_entries_query,
+	get_opening_group_field,
+	get_opening_rows,
+	get_totals_dict,
+	group_by_field,
+	merge_opening_rows,
+)
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+AMOUNT_FIELDS = ("debit", "credit", "debit_in_account_currency", "credit_in_account_currency")
+
+
+def can_use_columnar_aggregation(filters):
+	if np is None:
+		return False
+
+	mode = frappe.flags.general_ledger_aggregation
+	if not mode:
+		mode = "columnar" if frappe.conf.get("general_ledger_columnar_aggregation") else "row"
+
+	if mode != "columnar":
+		return False
+
+	# Presentation currency conversion and voucher consolidation both work on row dicts
+	return not filters.get("presentation_currency") and (
+		filters.get("group_by") != "Group by Voucher (Consolidated)"
+	)
+
+
+def get_result(filters, accounting_dimensions):
+	columns, rows = get_gl_rows(filters, accounting_dimensions)
+	col = {fieldname: idx for idx, fieldname in enumerate(columns)}
+	count = len(rows)
+
+	amounts = {
+		field: np.fromiter((r[col[field]] or 0.0 for r in rows), dtype=float, count=count)
+		for field in AMOUNT_FIELDS
+	}
+	posting_dates = np.array([r[col["posting_date"]] for r in rows], dtype="datetime64[D]")
+	is_opening = np.fromiter((r[col["is_opening"]] == "Yes" for r in rows), dtype=bool, count=count)
+
+	# Group codes follow first appearance, the order `initialize_gle_map` builds
+	group_idx = col[group_by_field(filters.get("group_by"))]
+	group_index = {}
+	codes = np.fromiter(
+		(group_index.setdefault(r[group_idx], len(group_index)) for r in rows), dtype=np.intp, count=count
+	)
+	group_count = len(group_index)
+
+	from_date = np.datetime64(getdate(filters.from_date), "D")
+	to_date = np.datetime64(getdate(filters.to_date), "D")
+	show_opening_entries = bool(filters.get("show_opening_entries"))
+
+	opening_mask = (posting_dates < from_date) | (is_opening & (not show_opening_entries))
+	period_mask = ~opening_mask & ((posting_dates <= to_date) | (is_opening & show_opening_entries))
+	closing_mask = opening_mask | period_mask
+
+	def grouped_sums(mask, group_codes, size):
+		return {
+			field: np.bincount(group_codes[mask], weights=amounts[field][mask], minlength=size)
+			for field in AMOUNT_FIELDS
+		}
+
+	report_codes = np.zeros(count, dtype=np.intp)
+	template = get_totals_dict()
+	group_totals = {
+		"opening": grouped_sums(opening_mask, codes, group_count),
+		"total": grouped_sums(period_mask, codes, group_count),
+		"closing": grouped_sums(closing_mask, codes, group_count),
+	}
+	report_totals = {
+		"opening": grouped_sums(opening_mask, report_codes, 1),
+		"total": grouped_sums(period_mask, report_codes, 1),
+		"closing": grouped_sums(closing_mask, report_codes, 1),
+	}
+
+	def totals_row(key, sums, idx):
+		row = getattr(template, key).copy()
+		for field in AMOUNT_FIELDS:
+			setattr(row, field, float(sums[key][field][idx]))
+		return row.as_dict()
+
+	# Displayed entries, grouped in display order; a stable sort keeps each group's row order
+	period_positions = np.flatnonzero(period_mask)
+	period_positions = period_positions[np.argsort(codes[period_positions], kind="stable")]
+	period_codes = codes[period_positions]
+	net = amounts["debit"][period_positions] - amounts["credit"][period_positions]
+	bounds = np.flatnonzero(np.diff(period_codes)) + 1
+	starts = np.concatenate(([0], bounds)) if len(period_positions) else np.array([], dtype=np.intp)
+	ends = np.concatenate((bounds, [len(period_positions)])) if len(period_positions) else starts
+
+	group_by = filters.get("group_by")
+	show_group_opening_closing = (not group_by and not filters.get("voucher_no")) or (
+		group_by and group_by != "Group by Voucher"
+	)
+	show_group_total = group_by or not filters.voucher_no
+
+	data = [totals_row("opening", report_totals, 0)]
+	for start, end in zip(starts.tolist(), ends.tolist(), strict=True):
+		code = int(period_codes[start])
+		balance = 0
+
+		data.append({"debit_in_transaction_currency": None, "credit_in_transaction_currency": None})
+		if show_group_opening_closing:
+			opening = totals_row("opening", group_totals, code)
+			data.append(opening)
+			balance = opening.debit - opening.credit
+
+		running = np.cumsum(np.concatenate(([balance], net[start:end])))[1:].tolist()
+		for position, row_balance in zip(period_positions[start:end].tolist(), running, strict=True):
+			entry = frappe._dict(zip(columns, rows[position], strict=True))
+			entry.balance = row_balance
+			data.append(entry)
+
+		if show_group_total:
+			data.append(totals_row("total", group_totals, code))
+
+		if show_group_opening_closing:
+			data.append(totals_row("closing", group_totals, code))
+
+	data.append({"debit_in_transaction_currency": None, "credit_in_transaction_currency": None})
+	data.append(totals_row("total", report_totals, 0))
+	data.append(totals_row("closing", report_totals, 0))
+
+	for d in data:
+		if "balance" not in d:
+			d["balance"] = d.get("debit", 0) - d.get("credit", 0)
+		d["account_currency"] = filters.account_currency
+
+	return data
+
+
+def get_gl_rows(filters, accounting_dimensions):
+	"""Ledger rows as tuples, with the pre-period opening rows merged in the same place as the row path."""
+	query, filter_conditions, load_opening = get_gl_entries_query(filters, accounting_dimensions)
+
+	rows = frappe.db.sql(query, filters, as_list=1)
+	columns = [d[0] for d in frappe.db.get_description()]
+
+	if load_opening:
+		group_field = get_opening_group_field(filters)
+		opening_rows = [
+			tuple(row.get(fieldname) for fieldname in columns)
+			for row in get_opening_rows(filters, filter_conditions, group_field)
+		]
+		rows = merge_opening_rows(group_field, opening_rows, rows, itemgetter(columns.index("account")))
+
+	return columns, rows
+
+
+def compare_with_row_path(filters):
+	"""
+	Run the report through both aggregation paths and list the rows that differ, e.g.
+
+	bench --site <site> execute custom_accounting.custom_accounting.report.report_override.general_ledger_columnar.compare_with_row_path --kwargs "{'filters': {...}}"
+	"""
+	results = {}
+	for mode in ("row", "columnar"):
+		frappe.flags.general_ledger_aggregation = mode
+		try:
+			# Unwrapped so the second run is not served from the report cache
+			results[mode] = execute.__wrapped__(frappe._dict(copy.deepcopy(filters)))[1]
+		finally:
+			frappe.flags.general_ledger_aggregation = None
+
+	expected, actual = results["row"], results["columnar"]
+	mismatches = [
+		{"idx": idx, "row": expected_row, "columnar": actual_row}
+		for idx, (expected_row, actual_row) in enumerate(zip(expected, actual, strict=False))
+		if dict(expected_row) != dict(actual_row)
+	]
+	if len(expected) != len(actual):
+		mismatches.append({"row_count": len(expected), "columnar_count": len(actual)})
+
+	return mismatches
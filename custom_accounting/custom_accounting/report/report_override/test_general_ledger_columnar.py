@@ -0,0 +1,112 @@
+import copy
+from datetime import date, datetime
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from custom_accounting.custom_accounting.report.report_override import (
+	general_ledger,
+	general_ledger_columnar,
+)
+
+COLUMNS = (
+	"gl_entry",
+	"posting_date",
+	"account",
+	"party_type",
+	"party",
+	"voucher_type",
+	"voucher_subtype",
+	"voucher_no",
+	"cost_center",
+	"project",
+	"against_voucher_type",
+	"against_voucher",
+	"account_currency",
+	"against",
+	"is_opening",
+	"creation",
+	"custom_item",
+	"bill_no",
+	"debit",
+	"credit",
+	"debit_in_account_currency",
+	"credit_in_account_currency",
+)
+
+# (posting_date, account, party, voucher_no, is_opening, debit, credit), in the row path's query order
+LEDGER = (
+	(date(2024, 3, 31), "Debtors - TC", "Customer A", None, "No", 1000.0, 0.0),
+	(date(2024, 4, 1), "Debtors - TC", "Customer A", "ACC-JV-0001", "Yes", 250.5, 0.0),
+	(date(2024, 4, 2), "Debtors - TC", "Customer A", "ACC-SINV-0001", "No", 400.25, 0.0),
+	(date(2024, 4, 2), "Sales - TC", None, "ACC-SINV-0001", "No", 0.0, 400.25),
+	(date(2024, 4, 5), "Cash - TC", None, "ACC-PAY-0001", "No", 300.0, 0.0),
+	(date(2024, 4, 5), "Debtors - TC", "Customer A", "ACC-PAY-0001", "No", 0.0, 300.0),
+	(date(2024, 4, 9), "Debtors - TC", "Customer B", "ACC-SINV-0002", "No", 125.75, 0.0),
+	(date(2024, 4, 9), "Sales - TC", None, "ACC-SINV-0002", "No", 0.0, 125.75),
+	(date(2024, 5, 1), "Cash - TC", None, "ACC-PAY-0002", "No", 50.0, 0.0),
+)
+
+
+def get_ledger_rows():
+	rows = []
+	for idx, (posting_date, account, party, voucher_no, is_opening, debit, credit) in enumerate(LEDGER):
+		row = dict.fromkeys(COLUMNS)
+		row.update(
+			gl_entry=f"ACC-GLE-{idx:04d}",
+			posting_date=posting_date,
+			account=account,
+			party_type="Customer" if party else None,
+			party=party,
+			voucher_type="Journal Entry" if voucher_no else None,
+			voucher_no=voucher_no,
+			account_currency="INR",
+			is_opening=is_opening,
+			creation=datetime(2024, 4, 1, 10, idx),
+			bill_no="",
+			debit=debit,
+			credit=credit,
+			debit_in_account_currency=debit,
+			credit_in_account_currency=credit,
+		)
+		rows.append(row)
+	return rows
+
+
+class TestGeneralLedgerColumnar(FrappeTestCase):
+	def setUp(self):
+		if general_ledger_columnar.np is None:
+			self.skipTest("NumPy is not installed")
+
+	def run_report(self, mode, filters):
+		rows = get_ledger_rows()
+		frappe.flags.general_ledger_aggregation = mode
+		try:
+			with (
+				patch.object(general_ledger, "get_gl_entries", return_value=[frappe._dict(r) for r in rows]),
+				patch.object(
+					general_ledger_columnar,
+					"get_gl_rows",
+					return_value=(list(COLUMNS), [tuple(r[c] for c in COLUMNS) for r in rows]),
+				),
+			):
+				return general_ledger.get_result(frappe._dict(copy.deepcopy(filters)), {})
+		finally:
+			frappe.flags.general_ledger_aggregation = None
+
+	def test_columnar_output_matches_row_path(self):
+		for group_by in (None, "Group by Account", "Group by Voucher", "Group by Party"):
+			for show_opening_entries in (0, 1):
+				filters = {
+					"company": "_Test Company",
+					"from_date": "2024-04-01",
+					"to_date": "2024-04-30",
+					"group_by": group_by,
+					"show_opening_entries": show_opening_entries,
+					"account_currency": "INR",
+				}
+				with self.subTest(group_by=group_by, show_opening_entries=show_opening_entries):
+					expected = [dict(row) for row in self.run_report("row", filters)]
+					actual = [dict(row) for row in self.run_report("columnar", filters)]
+					self.assertEqual(actual, expected)
@@ -1,3 +1,5 @@
+{% include "custom_accounting/public/js/report/background_result.js" %}
+
 frappe.query_reports["Segment-Wise Trial Balance"] = {
     filters: [
         {
@@ -86,5 +88,6 @@ frappe.query_reports["Segment-Wise Trial Balance"] = {
 
     onload: function (report) {
         report.page.add_inner_button(__("Refresh"), () => report.refresh());
+        custom_accounting.report.setup_background_result(report);
     }
 };
@@ -1,14 +1,44 @@
 import frappe
 from frappe import _
-from frappe.utils import flt, getdate, get_last_day, add_months, get_first_day
-from datetime import datetime
+from frappe.utils import flt, getdate
+from datetime import date, datetime
 from dateutil.relativedelta import relativedelta
 
+from custom_accounting.custom_accounting.doctype.gl_monthly_balance.gl_monthly_balance import (
+    is_snapshot_ready,
+)
+from custom_accounting.custom_accounting.report.background import (
+    estimate_gl_rows,
+    get_background_result,
+)
+from custom_accounting.custom_accounting.report.report_cache import cached_report
+from custom_accounting.custom_accounting.report.utils import (
+    get_budget_index,
+    get_gl_month_buckets,
+    get_period_ranges,
+    split_buckets_by_period,
+)
 
+
+REPORT_NAME = "Segment-Wise Trial Balance"
+
+
+def get_cache_range(filters):
+    return filters.get("company"), get_scan_from_date(filters), filters.get("to_date")
+
+
+@cached_report(REPORT_NAME, get_cache_range)
 def execute(filters=None):
     filters = frappe._dict(filters or {})
     validate_filters(filters)
 
+    # Large runs are prepared in the background and loaded by the report's JS
+    background = get_background_result(
+        REPORT_NAME, filters, get_columns(filters), lambda: estimate_report_rows(filters)
+    )
+    if background:
+        return background
+
     group_by = filters.get("group_by") or "Month"
 
     # Build periods based on grouping
@@ -60,6 +90,26 @@ def validate_filters(filters):
         frappe.throw(_("From Date cannot be greater than To Date"))
 
 
+def get_scan_from_date(filters):
+    """First date the report reads GL postings from; YTD figures start on January 1."""
+    if not filters.get("from_date"):
+        return None
+
+    from_date = getdate(filters.from_date)
+    if filters.get("currency_type") == "YTD Converted":
+        from_date = date(from_date.year, 1, 1)
+    return from_date
+
+
+def estimate_report_rows(filters):
+    return estimate_gl_rows(
+        filters.company,
+        get_scan_from_date(filters),
+        filters.to_date,
+        use_snapshot=is_snapshot_ready(filters.company),
+    )
+
+
 # -----------------------------
 # Period Generators
 # -----------------------------
@@ -97,65 +147,56 @@ def get_years_between(from_date, to_date):
 # -----------------------------
 # Data Builder
 # -----------------------------
+KEY_FIELDS = ("account", "cost_center", "account_currency")
+
+
+def get_conditions(filters):
+    conditions = []
+    if filters.get("account"):
+        conditions.append("AND account = %(account)s")
+    if filters.get("cost_center"):
+        conditions.append("AND cost_center = %(cost_center)s")
+    if filters.get("currency"):
+        conditions.append("AND account_currency = %(currency)s")
+
+    params = {
+        "company": filters.company,
+        "account": filters.get("account"),
+        "cost_center": filters.get("cost_center"),
+        "currency": filters.get("currency"),
+    }
+    return "\n".join(conditions), params
+
+
 def get_data(filters, periods, group_by):
     data = []
     grand_totals = {"debit": 0, "credit": 0, "variance": 0}
-    ytd_cache = {"debit": 0, "credit": 0}
-
-    for period in periods:
-        if group_by == "Month":
-            from_date = datetime.strptime(period, "%b %Y")
-            to_date = get_last_day(from_date)
-        elif group_by == "Quarter":
-            q, year = period.split()
-            q_num = int(q[1])
-            from_date = datetime(int(year), (q_num - 1) * 3 + 1, 1)
-            to_date = add_months(from_date, 3) - relativedelta(days=1)
-        else:
-            year = int(period)
-            from_date = datetime(year, 1, 1)
-            to_date = datetime(year, 12, 31)
-
-        if filters.currency_type == "YTD Converted":
-            ytd_from = get_first_day(datetime(from_date.year, 1, 1))
-        else:
-            ytd_from = from_date
-
-        gl_entries = frappe.db.sql(
-            """
-            SELECT account, cost_center, account_currency, SUM(debit) AS debit, SUM(credit) AS credit
-            FROM `tabGL Entry`
-            WHERE company = %(company)s
-                AND posting_date BETWEEN %(from_date)s AND %(to_date)s
-                {account_cond}
-                {cost_center_cond}
-                {currency_cond}
-            GROUP BY account, cost_center, account_currency
-            """.format(
-                account_cond="AND account = %(account)s" if filters.get("account") else "",
-                cost_center_cond="AND cost_center = %(cost_center)s" if filters.get("cost_center") else "",
-                currency_cond="AND account_currency = %(currency)s" if filters.get("currency") else "",
-            ),
-            {
-                "company": filters.company,
-                "from_date": ytd_from if filters.currency_type == "YTD Converted" else from_date,
-                "to_date": to_date,
-                "account": filters.get("account"),
-                "cost_center": filters.get("cost_center"),
-                "currency": filters.get("currency"),
-            },
-            as_dict=True,
-        )
-
-        period_debit = sum(flt(e.debit) for e in gl_entries)
-        period_credit = sum(flt(e.credit) for e in gl_entries)
-
-        if filters.currency_type == "YTD Converted":
-            ytd_cache["debit"] += period_debit
-            ytd_cache["credit"] += period_credit
-            period_debit = ytd_cache["debit"]
-            period_credit = ytd_cache["credit"]
+    is_ytd = filters.currency_type == "YTD Converted"
+
+    period_ranges = get_period_ranges(periods, group_by)
+    if not period_ranges:
+        return data, grand_totals
+
+    # Single GL scan; YTD figures are running totals over the month buckets
+    conditions, params = get_conditions(filters)
+    first_start = period_ranges[0][1]
+    params["from_date"] = date(first_start.year, 1, 1) if is_ytd else first_start
+    params["to_date"] = period_ranges[-1][2]
+    buckets = get_gl_month_buckets(
+        KEY_FIELDS, conditions, params, use_snapshot=is_snapshot_ready(filters.company)
+    )
+    period_rows, _activity = split_buckets_by_period(buckets, KEY_FIELDS, period_ranges, ytd=is_ytd)
 
+    budget_index = {}
+    if filters.show_variance:
+        budget_index = get_budget_index(filters.company, get_fiscal_year(filters.from_date))
+
+    header = None
+    for idx, (period, _from_date, _to_date) in enumerate(period_ranges):
+        gl_entries = period_rows[idx]
+
+        period_debit = sum(e.debit for e in gl_entries.values())
+        period_credit = sum(e.credit for e in gl_entries.values())
         period_balance = period_debit - period_credit
 
         header = {
@@ -172,21 +213,21 @@ def get_data(filters, periods, group_by):
 
         data.append(header)
 
-        for e in gl_entries:
+        for (account, cost_center, _currency), e in gl_entries.items():
             balance = flt(e.debit) - flt(e.credit)
             row = {
-                "name": e.account,
+                "name": account,
                 "parent": period,
                 "indent": 1,
                 "is_group": 0,
-                "account": e.account,
-                "cost_center": e.cost_center,
+                "account": account,
+                "cost_center": cost_center,
                 "debit": flt(e.debit),
                 "credit": flt(e.credit),
                 "balance": flt(balance),
             }
             if filters.show_variance:
-                variance = compute_variance(e.account, e.cost_center, filters, balance)
+                variance = compute_variance(budget_index, account, cost_center, balance)
                 row["variance"] = variance
                 header["variance"] += variance
             data.append(row)
@@ -196,28 +237,21 @@ def get_data(filters, periods, group_by):
         if filters.show_variance:
             grand_totals["variance"] += header["variance"]
 
+    # YTD headers are already cumulative, so the grand total is the last period's figure
+    if is_ytd and header:
+        grand_totals["debit"] = header["debit"]
+        grand_totals["credit"] = header["credit"]
+        if filters.show_variance:
+            grand_totals["variance"] = header["variance"]
+
     return data, grand_totals
 
 
 # -----------------------------
 # Variance Logic
 # -----------------------------
-def compute_variance(account, cost_center, filters, actual_balance):
-    fiscal_year = get_fiscal_year(filters.from_date)
-    budget = frappe.db.sql(
-        """
-        SELECT COALESCE(SUM(budget_amount), 0) AS total
-        FROM `tabBudget Account`
-        WHERE account = %s
-          AND parent IN (
-              SELECT name FROM `tabBudget`
-              WHERE cost_center = %s AND fiscal_year = %s
-          )
-        """,
-        (account, cost_center or None, fiscal_year),
-        as_dict=True,
-    )
-    budget_val = budget[0].total if budget else 0.0
+def compute_variance(budget_index, account, cost_center, actual_balance):
+    budget_val = budget_index.get((account, cost_center), 0.0)
     return actual_balance - budget_val
 
 
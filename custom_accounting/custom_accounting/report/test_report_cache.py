@@ -0,0 +1,54 @@
+import frappe
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from frappe.tests.utils import FrappeTestCase
+
+from custom_accounting.custom_accounting.report import report_cache
+
+COMPANY = "_Test Company"
+
+
+class TestReportCache(FrappeTestCase):
+	def setUp(self):
+		self.cache_key = frappe.generate_hash()
+		report_cache.set_entry(
+			self.cache_key,
+			f"{COMPANY}|{self.cache_key}",
+			COMPANY,
+			"2024-04-01",
+			"2024-04-30",
+			([], [{"account": "_Test Bank - _TC"}]),
+		)
+
+	def tearDown(self):
+		report_cache.delete_entry(COMPANY, self.cache_key)
+		frappe.cache.delete_value(report_cache.get_inflight_key(self.cache_key))
+
+	def post_journal_entry(self, posting_date):
+		make_journal_entry(
+			"_Test Bank - _TC", "_Test Cash - _TC", 100, posting_date=posting_date, submit=True
+		)
+		# Invalidation is deferred until the transaction commits
+		frappe.db.after_commit.run()
+
+	def is_cached(self):
+		member = f"{COMPANY}|{self.cache_key}".encode()
+		return (
+			frappe.cache.get_value(report_cache.get_entry_key(self.cache_key), expires=True) is not None,
+			self.cache_key.encode() in frappe.cache.hkeys(report_cache.get_company_index_key(COMPANY)),
+			member in frappe.cache.zrange(frappe.cache.make_key(report_cache.LRU_KEY), 0, -1),
+		)
+
+	def test_gl_posting_in_cached_range_drops_entry(self):
+		self.post_journal_entry("2024-04-15")
+		self.assertEqual(self.is_cached(), (False, False, False))
+
+	def test_gl_posting_in_cached_range_drops_inflight_result(self):
+		inflight_key = report_cache.get_inflight_key(self.cache_key)
+		frappe.cache.set_value(inflight_key, ([], []), expires_in_sec=report_cache.COALESCE_RESULT_TTL)
+
+		self.post_journal_entry("2024-04-15")
+		self.assertIsNone(frappe.cache.get_value(inflight_key, expires=True))
+
+	def test_gl_posting_outside_cached_range_keeps_entry(self):
+		self.post_journal_entry("2024-05-15")
+		self.assertEqual(self.is_cached(), (True, True, True))
@@ -0,0 +1,153 @@
+from datetime import date, datetime
+
+import frappe
+from frappe import _dict
+from frappe.utils import add_months, flt, get_last_day, getdate
+
+
+def get_period_ranges(periods, group_by):
+	"""Return a ``(label, start, end)`` tuple for every period label built by the period generators."""
+	ranges = []
+	for period in periods:
+		if group_by == "Month":
+			start = getdate(datetime.strptime(period, "%b %Y"))
+			end = get_last_day(start)
+		elif group_by == "Quarter":
+			q, year = period.split()
+			start = date(int(year), (int(q[1]) - 1) * 3 + 1, 1)
+			end = get_last_day(add_months(start, 2))
+		else:
+			start = date(int(period), 1, 1)
+			end = date(int(period), 12, 31)
+		ranges.append((period, start, end))
+	return ranges
+
+
+def get_month_period_map(period_ranges):
+	"""Map every ``(year, month)`` covered by ``period_ranges`` to the index of its period."""
+	month_map = {}
+	for idx, (_label, start, end) in enumerate(period_ranges):
+		current = start
+		while current <= end:
+			month_map[(current.year, current.month)] = idx
+			current = add_months(current, 1)
+	return month_map
+
+
+def get_gl_month_buckets(key_fields, conditions, params, use_snapshot=False):
+	"""
+	Aggregate GL activity by ``key_fields`` and calendar month in a single scan.
+
+	``params`` must carry ``company``, ``from_date`` and ``to_date``; ``conditions`` is
+	appended verbatim to the WHERE clause. With ``use_snapshot`` the rows come from
+	`tabGL Monthly Balance` instead of `tabGL Entry`, so ``from_date`` and ``to_date``
+	must fall on month boundaries and ``conditions`` may only use the snapshot's columns.
+	"""
+	return frappe.db.sql(
+		get_gl_month_buckets_query(key_fields, conditions, use_snapshot=use_snapshot),
+		params,
+		as_dict=True,
+	)
+
+
+def get_gl_month_buckets_query(key_fields, conditions, use_snapshot=False):
+	fields = ", ".join(key_fields)
+	if use_snapshot:
+		table, date_field = "`tabGL Monthly Balance`", "period_start"
+	else:
+		table, date_field = "`tabGL Entry`", "posting_date"
+
+	return f"""
+		SELECT {fields}, YEAR({date_field}) AS year, MONTH({date_field}) AS month,
+			SUM(debit) AS debit, SUM(credit) AS credit
+		FROM {table}
+		WHERE company = %(company)s
+			AND {date_field} BETWEEN %(from_date)s AND %(to_date)s
+			{conditions}
+		GROUP BY {fields}, YEAR({date_field}), MONTH({date_field})
+		ORDER BY {fields}, year, month
+		"""
+
+
+def split_buckets_by_period(buckets, key_fields, period_ranges, ytd=False):
+	"""
+	Fold month buckets into per-period rows.
+
+	Returns ``(period_rows, activity)`` where ``period_rows[i]`` maps the ``key_fields`` tuple
+	to a ``_dict(debit, credit)`` for the i-th period (year-to-date when ``ytd`` is set) and
+	``activity[i]`` holds the period-only debit and credit totals.
+	"""
+	month_map = get_month_period_map(period_ranges)
+	period_rows = [{} for _p in period_ranges]
+	activity = [_dict(debit=0.0, credit=0.0) for _p in period_ranges]
+	key_order = {}
+	by_month = {}
+
+	for b in buckets:
+		key = tuple(b[f] for f in key_fields)
+		key_order.setdefault(key, len(key_order))
+		debit, credit = flt(b.debit), flt(b.credit)
+
+		idx = month_map.get((b.year, b.month))
+		if idx is not None:
+			activity[idx].debit += debit
+			activity[idx].credit += credit
+
+		if ytd:
+			by_month.setdefault((b.year, b.month), []).append((key, debit, credit))
+		elif idx is not None:
+			row = period_rows[idx].setdefault(key, _dict(debit=0.0, credit=0.0))
+			row.debit += debit
+			row.credit += credit
+
+	if ytd:
+		period_rows = get_ytd_period_rows(by_month, period_ranges, key_order)
+
+	return period_rows, activity
+
+
+def get_ytd_period_rows(by_month, period_ranges, key_order):
+	"""
+	Running year-to-date totals per key as of each period end.
+
+	Every month bucket is added exactly once; the running totals reset whenever a period
+	falls in a new calendar year.
+	"""
+	period_rows = []
+	running = {}
+	months = sorted(by_month)
+	pos = 0
+	year = None
+
+	for _label, _start, end in period_ranges:
+		if end.year != year:
+			running, year = {}, end.year
+			while pos < len(months) and months[pos][0] < year:
+				pos += 1
+
+		while pos < len(months) and months[pos] <= (end.year, end.month):
+			for key, debit, credit in by_month[months[pos]]:
+				row = running.setdefault(key, _dict(debit=0.0, credit=0.0))
+				row.debit += debit
+				row.credit += credit
+			pos += 1
+
+		period_rows.append({key: _dict(running[key]) for key in sorted(running, key=key_order.get)})
+
+	return period_rows
+
+
+def get_budget_index(company, fiscal_year):
+	"""Total budget amount per ``(account, cost_center)`` for a company and fiscal year, read in one query."""
+	budgets = frappe.db.sql(
+		"""
+		SELECT ba.account, b.cost_center, SUM(ba.budget_amount) AS total_budget
+		FROM `tabBudget Account` ba
+		INNER JOIN `tabBudget` b ON b.name = ba.parent
+		WHERE b.company = %s AND b.fiscal_year = %s AND b.cost_center IS NOT NULL
+		GROUP BY ba.account, b.cost_center
+		""",
+		(company, fiscal_year),
+		as_dict=True,
+	)
+	return {(d.account, d.cost_center): flt(d.total_budget) for d in budgets}
@@ -75,8 +75,61 @@ fixtures = [
 ]
 
 doc_events = {
+    "Account": {
+        "on_update": [
+            "custom_accounting.custom_accounting.account.account_index.clear_account_index",
+            "custom_accounting.custom_accounting.account.account_tree_index.clear_account_tree_index",
+            "custom_accounting.custom_accounting.account.account_tree_balances.clear_tree_balances"
+        ],
+        "on_trash": [
+            "custom_accounting.custom_accounting.account.account_index.clear_account_index",
+            "custom_accounting.custom_accounting.account.account_tree_index.clear_account_tree_index",
+            "custom_accounting.custom_accounting.account.account_tree_balances.clear_tree_balances"
+        ],
+        "after_rename": [
+            "custom_accounting.custom_accounting.account.account_index.clear_account_index",
+            "custom_accounting.custom_accounting.account.account_tree_index.clear_account_tree_index",
+            "custom_accounting.custom_accounting.account.account_tree_balances.clear_tree_balances"
+        ]
+    },
     "Location": {
-        "autoname": "custom_accounting.custom_accounting.naming.naming_series.set_location_name"
+        "autoname": "custom_accounting.custom_accounting.naming.naming_series.set_location_name",
+        "on_update": "custom_accounting.custom_accounting.account.account_tree_index.clear_account_tree_index",
+        "on_trash": "custom_accounting.custom_accounting.account.account_tree_index.clear_account_tree_index",
+        "after_rename": "custom_accounting.custom_accounting.account.account_tree_index.clear_account_tree_index"
+    },
+    "Cost Center": {
+        "on_update": [
+            "custom_accounting.custom_accounting.account.account_tree_index.clear_account_tree_index",
+            "custom_accounting.custom_accounting.account.cost_center_index.clear_cost_center_index"
+        ],
+        "on_trash": [
+            "custom_accounting.custom_accounting.account.account_tree_index.clear_account_tree_index",
+            "custom_accounting.custom_accounting.account.cost_center_index.clear_cost_center_index"
+        ],
+        "after_rename": [
+            "custom_accounting.custom_accounting.account.account_tree_index.clear_account_tree_index",
+            "custom_accounting.custom_accounting.account.cost_center_index.clear_cost_center_index"
+        ]
+    },
+    "Repost Item Valuation": {
+        "on_submit": "custom_accounting.custom_accounting.doctype.gl_monthly_balance.gl_monthly_balance.mark_snapshot_stale_for_repost"
+    },
+    "Repost Accounting Ledger": {
+        "on_submit": "custom_accounting.custom_accounting.doctype.gl_monthly_balance.gl_monthly_balance.mark_snapshot_stale_for_repost"
+    },
+    "GL Entry": {
+        "before_insert": "custom_accounting.custom_accounting.ledger.gl_entry_fields.set_custom_fields",
+        "on_submit": [
+            "custom_accounting.custom_accounting.doctype.gl_monthly_balance.gl_monthly_balance.update_from_gl_entry",
+            "custom_accounting.custom_accounting.report.report_cache.invalidate_for_gl_entry",
+            "custom_accounting.custom_accounting.account.account_tree_balances.clear_tree_balances"
+        ],
+        "on_trash": [
+            "custom_accounting.custom_accounting.doctype.gl_monthly_balance.gl_monthly_balance.reverse_gl_entry",
+            "custom_accounting.custom_accounting.report.report_cache.invalidate_for_gl_entry",
+            "custom_accounting.custom_accounting.account.account_tree_balances.clear_tree_balances"
+        ]
     }
 }
 
@@ -123,7 +176,8 @@ doc_events = {
 # ------------
 
 # before_install = "custom_accounting.install.before_install"
-# after_install = "custom_accounting.install.after_install"
+after_install = "custom_accounting.install.after_install"
+after_migrate = "custom_accounting.install.after_migrate"
 
 # Uninstallation
 # ------------
@@ -206,6 +260,15 @@ doc_events = {
 # 	],
 # }
 
+scheduler_events = {
+    "hourly": [
+        "custom_accounting.custom_accounting.doctype.gl_monthly_balance.gl_monthly_balance.rebuild_stale_snapshots"
+    ],
+    "daily": [
+        "custom_accounting.custom_accounting.report.background.delete_old_results"
+    ]
+}
+
 # Testing
 # -------
 
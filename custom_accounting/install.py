@@ -0,0 +1,9 @@
+from custom_accounting.custom_accounting.report.report_indexes import ensure_report_indexes
+
+
+def after_install():
+	ensure_report_indexes()
+
+
+def after_migrate():
+	ensure_report_indexes()
@@ -0,0 +1,5 @@
+from custom_accounting.custom_accounting.report.report_indexes import ensure_report_indexes
+
+
+def execute():
+	ensure_report_indexes()
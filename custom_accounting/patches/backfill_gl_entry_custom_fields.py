@@ -0,0 +1,49 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+from custom_accounting.custom_accounting.ledger.gl_entry_fields import CUSTOM_ITEM_DOCTYPES
+
+
+def execute():
+	# Fixtures are synced after patches run, so make sure the columns exist first
+	create_custom_fields(
+		{
+			"GL Entry": [
+				{
+					"fieldname": "custom_item",
+					"fieldtype": "Data",
+					"label": "Item",
+					"insert_after": "voucher_detail_no",
+					"read_only": 1,
+				},
+				{
+					"fieldname": "custom_bill_no",
+					"fieldtype": "Data",
+					"label": "Supplier Invoice No",
+					"insert_after": "against_voucher",
+					"read_only": 1,
+				},
+			]
+		},
+		update=False,
+	)
+
+	for doctype in CUSTOM_ITEM_DOCTYPES:
+		frappe.db.sql(
+			f"""
+			UPDATE `tabGL Entry` gle
+			INNER JOIN `tab{doctype}` voucher ON voucher.name = gle.voucher_no
+			SET gle.custom_item = voucher.custom_item
+			WHERE gle.voucher_type = %s AND IFNULL(voucher.custom_item, '') != ''
+			""",
+			doctype,
+		)
+
+	frappe.db.sql(
+		"""
+		UPDATE `tabGL Entry` gle
+		INNER JOIN `tabPurchase Invoice` pi ON pi.name = gle.against_voucher
+		SET gle.custom_bill_no = pi.bill_no
+		WHERE gle.against_voucher_type = 'Purchase Invoice' AND IFNULL(pi.bill_no, '') != ''
+		"""
+	)
@@ -1,5 +1,137 @@
 frappe.provide("frappe.treeview_settings");
 
+const SUBTREE_METHOD = "custom_accounting.custom_accounting.account.custom_account_hierarchy.get_subtree";
+const NODE_BALANCES_METHOD = "custom_accounting.custom_accounting.account.custom_account_hierarchy.get_node_balances";
+const SEARCH_METHOD = "custom_accounting.custom_accounting.account.custom_account_hierarchy.search_accounts";
+
+function render_balance(node, balance_info) {
+	const balance = balance_info.balance_in_account_currency || balance_info.balance;
+	const dr_or_cr = balance > 0 ? "Dr" : "Cr";
+	const format = (value, currency) => format_currency(Math.abs(value), currency);
+
+	if (balance_info.balance !== undefined) {
+		node.parent && node.parent.find(".balance-area").remove();
+		$(
+			'<span class="balance-area pull-right">' +
+				(balance_info.balance_in_account_currency
+					? format(balance_info.balance_in_account_currency, balance_info.account_currency) + " / "
+					: "") +
+				format(balance_info.balance, balance_info.company_currency) +
+				" " +
+				dr_or_cr +
+				"</span>"
+		).insertBefore(node.$ul);
+	}
+}
+
+// Expand the tree along `path` (node values from the company down) and select the last node
+async function expand_path(tree, path) {
+	let node = tree.root_node;
+	if (!node.loaded) {
+		await tree.load_children(node);
+	}
+
+	for (let value of path) {
+		if (value === node.data.value) continue;
+
+		node = tree.nodes[value];
+		if (!node) return;
+
+		if (node.expandable && !node.loaded) {
+			await tree.load_children(node);
+		} else if (node.expandable && !node.expanded) {
+			tree.toggle_node(node);
+		}
+	}
+
+	tree.set_selected_node(node);
+	node.$tree_link && node.$tree_link[0].scrollIntoView({ block: "center" });
+}
+
+function find_account(treeview) {
+	const dialog = new frappe.ui.Dialog({
+		title: __("Find Account"),
+		fields: [
+			{
+				fieldtype: "Data",
+				fieldname: "txt",
+				label: __("Account Number, Name, Location or Cost Center"),
+				onchange: () => search(),
+			},
+			{ fieldtype: "HTML", fieldname: "results" },
+		],
+	});
+	const $results = dialog.fields_dict.results.$wrapper;
+
+	function search() {
+		const txt = dialog.get_value("txt");
+		if (!txt) {
+			$results.empty();
+			return;
+		}
+
+		frappe
+			.xcall(SEARCH_METHOD, {
+				company: treeview.page.fields_dict.company.get_value(),
+				txt: txt,
+			})
+			.then((accounts) => {
+				$results.empty();
+				if (!accounts.length) {
+					$results.html(`<p class="text-muted">${__("No accounts found")}</p>`);
+					return;
+				}
+
+				for (let account of accounts) {
+					const label = [
+						account.account_number,
+						account.account_name,
+						account.location,
+						account.cost_center,
+					]
+						.filter(Boolean)
+						.map((part) => frappe.utils.escape_html(part))
+						.join(" · ");
+
+					$(`<a class="list-group-item list-group-item-action">${label}</a>`)
+						.on("click", () => {
+							dialog.hide();
+							expand_path(treeview.tree, account.path);
+						})
+						.appendTo($results);
+				}
+			});
+	}
+
+	dialog.show();
+}
+
+// "Expand All": fetch the whole subtree with its balances in one call instead of one call per node
+function use_subtree_for_expand_all(tree) {
+	tree.get_all_nodes = function (value, is_root, label) {
+		const args = Object.assign({}, this.args, {
+			parent: value,
+			is_root: is_root,
+			label: label || value,
+		});
+		return frappe.xcall(SUBTREE_METHOD, args);
+	};
+
+	const render_children_of_all_nodes = tree.render_children_of_all_nodes;
+	tree.render_children_of_all_nodes = function (data_list) {
+		render_children_of_all_nodes.call(this, data_list);
+
+		for (let d of data_list) {
+			for (let child of d.data) {
+				const node = child.balance && this.nodes[child.value];
+				if (node && !node.is_root) {
+					render_balance(node, child.balance);
+				}
+			}
+		}
+	};
+}
+
 frappe.treeview_settings["Account"] = {
 	breadcrumb: "Accounts",
 	title: __("Chart of Accounts"),
@@ -57,108 +189,39 @@ frappe.treeview_settings["Account"] = {
 		const company = cur_tree.args.company;
 		if (!company) return;
 
-		frappe.db.get_value("Company", company, "abbr", (r) => {
-			const company_abbr = r ? (r.abbr || "") : "";
-			const company_suffix = company_abbr ? ` - ${company_abbr}` : "";
-
-			let all_nodes = [];
-			if (deep) {
-				// Collect all nodes recursively if data is present
-				function collect(acc, node_list) {
-					for (let node of node_list) {
-						acc.push(node);
-						if (node.data && node.data.length) {
-							collect(acc, node.data);
-						}
+		let all_nodes = [];
+		if (deep) {
+			// Collect all nodes recursively if data is present
+			function collect(acc, node_list) {
+				for (let node of node_list) {
+					acc.push(node);
+					if (node.data && node.data.length) {
+						collect(acc, node.data);
 					}
 				}
-				collect(all_nodes, nodes);
-			} else {
-				all_nodes = nodes;
 			}
+			collect(all_nodes, nodes);
+		} else {
+			all_nodes = nodes;
+		}
 
-			// FIX: Include both base nodes (parent accounts) and real accounts for balance calculation
-			const accounts_for_balance = all_nodes
-				.filter((node) => node && node.value && node.is_ledger)
-				.map((node) => {
-					// For base nodes (without suffix), we need to find the real account name
-					if (!node.value.endsWith(company_suffix)) {
-						// This is a base node, construct the real account name
-						return {
-							value: node.value + company_suffix,
-							account_currency: node.account_currency || null,
-							is_base_node: true,
-							original_value: node.value // Keep original for mapping back
-						};
-					} else {
-						// This is a real account
-						return {
-							value: node.value,
-							account_currency: node.account_currency || null,
-							is_base_node: false,
-							original_value: node.value
-						};
-					}
-				});
-
-			if (accounts_for_balance.length === 0) return;
-
-			frappe.db.get_single_value("Accounts Settings", "show_balance_in_coa").then((value) => {
-				if (value) {
-					const get_balances = frappe.call({
-						method: "erpnext.accounts.utils.get_account_balances",
-						args: {
-							accounts: accounts_for_balance.map(acc => ({
-								value: acc.value,
-								account_currency: acc.account_currency
-							})),
-							company: company,
-						},
-					});
-
-					get_balances.then((r) => {
-						if (!r.message || r.message.length == 0) return;
-
-						// Create a mapping of account value to balance data
-						const balance_map = {};
-						r.message.forEach(account => {
-							balance_map[account.value] = account;
-						});
-
-						for (let account_data of accounts_for_balance) {
-							const balance_info = balance_map[account_data.value];
-							if (!balance_info) continue;
-
-							// Find the corresponding node - for base nodes use original_value, for real accounts use value
-							const node_value = account_data.is_base_node ? account_data.original_value : account_data.value;
-							const node = cur_tree.nodes && cur_tree.nodes[node_value];
-							if (!node || node.is_root) continue;
+		// Accounts as well as the synthetic Location and Cost Center nodes, in one call
+		const values = all_nodes.filter((node) => node && node.value).map((node) => node.value);
+		if (values.length === 0) return;
 
-							const balance = balance_info.balance_in_account_currency || balance_info.balance;
-							const dr_or_cr = balance > 0 ? "Dr" : "Cr";
-							const format = (value, currency) => format_currency(Math.abs(value), currency);
+		frappe
+			.xcall(NODE_BALANCES_METHOD, {
+				company: company,
+				nodes: values,
+			})
+			.then((balances) => {
+				for (let [value, balance_info] of Object.entries(balances || {})) {
+					const node = cur_tree.nodes && cur_tree.nodes[value];
+					if (!node || node.is_root) continue;
 
-							if (balance_info.balance !== undefined) {
-								node.parent && node.parent.find(".balance-area").remove();
-								$(
-									'<span class="balance-area pull-right">' +
-										(balance_info.balance_in_account_currency
-											? format(
-													balance_info.balance_in_account_currency,
-													balance_info.account_currency
-											  ) + " / "
-											: "") +
-										format(balance_info.balance, balance_info.company_currency) +
-										" " +
-										dr_or_cr +
-										"</span>"
-								).insertBefore(node.$ul);
-							}
-						}
-					});
+					render_balance(node, balance_info);
 				}
 			});
-		});
 	},
 	add_tree_node: "custom_accounting.custom_accounting.account.custom_account_hierarchy.add_custom_ac",
 	menu_items: [
@@ -236,6 +299,10 @@ frappe.treeview_settings["Account"] = {
 			return treeview.page.fields_dict.company.get_value();
 		}
 
+		treeview.page.add_inner_button(__("Find Account"), function () {
+			find_account(frappe.treeview_settings["Account"].treeview);
+		});
+
 		// tools
 		treeview.page.add_inner_button(
 			__("Chart of Cost Centers"),
@@ -297,6 +364,7 @@ frappe.treeview_settings["Account"] = {
 	},
 	post_render: function (treeview) {
 		frappe.treeview_settings["Account"].treeview["tree"] = treeview.tree;
+		use_subtree_for_expand_all(treeview.tree);
 		if (treeview.can_create) {
 			treeview.page.set_primary_action(
 				__("New"),
@@ -341,62 +409,16 @@ frappe.treeview_settings["Account"] = {
 			label: __("View Ledger"),
 			click: function (node, btn) {
 				const company = frappe.treeview_settings["Account"].treeview.page.fields_dict.company.get_value();
-				frappe.db.get_value("Company", company, "abbr", (r) => {
-					const abbr = r ? r.abbr || "" : "";
-					const suffix = abbr ? ` - ${abbr}` : "";
-					let acc_value = node.value;
-					if (!acc_value.endsWith(suffix)) {
-						// Parse and get real docname
-						let acc_no = null;
-						let acc_name;
-						if (acc_value.includes(" - ")) {
-							const parts = acc_value.split(" - ");
-							acc_no = parts[0];
-							acc_name = parts.slice(1).join(" - ");
-						} else {
-							acc_name = acc_value;
-						}
-						const filters = {
-							company: company,
-							account_name: acc_name
-						};
-						if (acc_no) {
-							filters.account_number = acc_no;
-						}
-						frappe.call({
-							method: "frappe.client.get_list",
-							args: {
-								doctype: "Account",
-								filters: filters,
-								fields: ["name"],
-								limit: 1
-							},
-							callback: (resp) => {
-								if (resp.message && resp.message.length > 0) {
-									acc_value = resp.message[0].name;
-								} else {
-									frappe.msgprint(__("Account not found"));
-									return;
-								}
-								frappe.route_options = {
-									from_date: erpnext.utils.get_fiscal_year(frappe.datetime.get_today(), true)[1],
-									to_date: erpnext.utils.get_fiscal_year(frappe.datetime.get_today(), true)[2],
-									company: company,
-									account: acc_value
-								};
-								frappe.set_route("query-report", "General Ledger");
-							}
-						});
-					} else {
-						frappe.route_options = {
-							from_date: erpnext.utils.get_fiscal_year(frappe.datetime.get_today(), true)[1],
-							to_date: erpnext.utils.get_fiscal_year(frappe.datetime.get_today(), true)[2],
-							company: company,
-							account: acc_value
-						};
-						frappe.set_route("query-report", "General Ledger");
-					}
-				});
+				// Ledger nodes carry the Account they stand for, also when titled "acc_no - acc_name"
+				const account = node.account || (node.data && node.data.account) || node.value;
+
+				frappe.route_options = {
+					from_date: erpnext.utils.get_fiscal_year(frappe.datetime.get_today(), true)[1],
+					to_date: erpnext.utils.get_fiscal_year(frappe.datetime.get_today(), true)[2],
+					company: company,
+					account: account,
+				};
+				frappe.set_route("query-report", "General Ledger");
 			},
 			btnClass: "hidden-xs",
 		},
@@ -0,0 +1,57 @@
+// Shared by the reports whose large runs are prepared in the background (report/background.py).
+// Such a run comes back as a placeholder message naming the prepared result; its status is
+// polled until it is done and the report is then refreshed once to show it.
+
+frappe.provide("custom_accounting.report");
+
+custom_accounting.report.BACKGROUND_POLL_INTERVAL = 5000;
+
+custom_accounting.report.setup_background_result = function (report) {
+    // The report view is shared by every report, so refresh is only wrapped once
+    if (!report.background_result_refresh) {
+        report.background_result_refresh = report.refresh;
+
+        // Every run, including one started by a filter change, replaces the previous poll
+        report.refresh = function (...args) {
+            custom_accounting.report.stop_background_poll(report);
+            return Promise.resolve(report.background_result_refresh.apply(report, args)).then((r) => {
+                custom_accounting.report.start_background_poll(report);
+                return r;
+            });
+        };
+    }
+
+    custom_accounting.report.start_background_poll(report);
+};
+
+custom_accounting.report.start_background_poll = function (report) {
+    const message = (report.raw_data && report.raw_data.message) || "";
+    const match = typeof message === "string" && message.match(/data-background-result="([^"]+)"/);
+    if (!match || report.background_poll) return;
+
+    const result_name = match[1];
+    report.background_poll = setInterval(() => {
+        if (report.checking_background_result) return;
+
+        report.checking_background_result = true;
+        frappe
+            .xcall("custom_accounting.custom_accounting.report.background.get_result_status", {
+                result_name: result_name
+            })
+            .then((status) => {
+                if (status === "Queued" || status === "Started") return;
+
+                custom_accounting.report.stop_background_poll(report);
+                if (status === "Completed" || status === "Error") report.refresh();
+            })
+            .catch(() => custom_accounting.report.stop_background_poll(report))
+            .finally(() => {
+                report.checking_background_result = false;
+            });
+    }, custom_accounting.report.BACKGROUND_POLL_INTERVAL);
+};
+
+custom_accounting.report.stop_background_poll = function (report) {
+    clearInterval(report.background_poll);
+    report.background_poll = null;
+};
@@ -229,7 +229,51 @@ frappe.query_reports["General Ledger"] = {
 			label: __("Ignore System Generated Credit / Debit Notes"),
 			fieldtype: "Check",
 		},
+		{
+			fieldname: "load_in_pages",
+			label: __("Load in Pages"),
+			fieldtype: "Check",
+		},
 	],
+
+	onload: function (report) {
+		report.page.add_inner_button(__("Load Next Page"), function () {
+			load_next_ledger_page(report);
+		});
+	},
 };
 
+function load_next_ledger_page(report) {
+	let filters = report.get_filter_values(true);
+	if (!filters) return;
+
+	if (!filters.load_in_pages) {
+		frappe.msgprint(__("Enable {0} to load the ledger page by page", [__("Load in Pages")]));
+		return;
+	}
+
+	// Every page but the last ends with a row carrying the cursor to continue from
+	let data = report.data || [];
+	let last = data[data.length - 1];
+	if (!last || !last.ledger_page_cursor) {
+		frappe.show_alert({ message: __("All entries are loaded"), indicator: "green" });
+		return;
+	}
+
+	frappe.call({
+		method: "custom_accounting.custom_accounting.report.report_override.general_ledger.get_ledger_page",
+		args: {
+			filters: filters,
+			cursor: last.ledger_page_cursor,
+		},
+		freeze: true,
+		callback: function (r) {
+			if (!r.message) return;
+
+			report.data = data.concat(r.message.rows);
+			report.datatable.refresh(report.data, report.columns);
+		},
+	});
+}
+
 erpnext.utils.add_dimensions("General Ledger", 15);